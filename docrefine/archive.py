@@ -0,0 +1,105 @@
+# SAVE AS: docrefine/archive.py
+import os
+import time
+import shutil
+import tarfile
+import zipfile
+from pathlib import Path
+
+MB = 1024 * 1024
+STREAM_CHUNK = 4 * MB
+# Already compressed containers and media: deflating them again only burns CPU
+STORED_EXTENSIONS = {'.pdf', '.jpg', '.jpeg', '.png', '.gif', '.tif', '.tiff', '.docx', '.xlsx', '.pptx',
+                     '.zip', '.7z', '.gz', '.rar', '.mp3', '.mp4', '.mov'}
+ARCHIVE_FORMATS = ("Zip", "Tar")
+
+# ==============================================================================
+#   STREAMING ARCHIVE
+# ==============================================================================
+class ArchiveWriter:
+    """
+    Streams files straight into a zip or tar delivery in one pass with constant memory.
+    Zip stores already-compressed formats and deflates the rest; tar writes repeated sources
+    as hard-link members, so duplicate copies cost a header instead of their bytes.
+    With volume_mb > 0 the output is split into independent volumes (Name.part001.zip, ...);
+    a volume is closed before a file could push its on-disk size past the limit.
+    """
+    def __init__(self, base, fmt="Zip", volume_mb=0):
+        self.base = Path(base)
+        self.fmt = fmt
+        self.limit = int(volume_mb) * MB
+        self.ext = ".zip" if fmt == "Zip" else ".tar"
+        self.volumes = []
+        self.bytes = 0
+        self.files = 0
+        self.linked = 0
+        self._arc = None
+        self._vol_bytes = 0
+        self._names = set()
+        self._sources = {}
+        self._start = time.time()
+
+    def clear_previous(self):
+        """Removes volumes a previous delivery left under the same base name (any format, any split)."""
+        for p in self.base.parent.glob(f"{self.base.name}*"):
+            if p.suffix in {".zip", ".tar"} and (p.stem == self.base.name or p.stem.startswith(f"{self.base.name}.part")):
+                try: p.unlink()
+                except OSError: pass
+
+    def _volume_path(self, n):
+        if not self.limit: return self.base.with_suffix(self.ext)
+        return self.base.with_name(f"{self.base.name}.part{n:03d}{self.ext}")
+
+    def _open_volume(self):
+        self.close_volume()
+        p = self._volume_path(len(self.volumes) + 1)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        self._arc = zipfile.ZipFile(p, 'w', allowZip64=True) if self.fmt == "Zip" else tarfile.open(p, 'w', format=tarfile.PAX_FORMAT)
+        self.volumes.append(p)
+        self._vol_bytes = 0; self._names = set(); self._sources = {}
+
+    def close_volume(self):
+        if self._arc is not None: self._arc.close(); self._arc = None
+
+    def add(self, src, arcname):
+        """Appends one file under arcname (posix path). Returns False for a name already in this volume."""
+        arcname = Path(arcname).as_posix()
+        size = os.path.getsize(src)
+        key = os.path.realpath(src)
+        linked = self.fmt == "Tar" and key in self._sources
+        # Worst case (stored, or a full tar member) against what the volume already holds on disk
+        if self._arc is None or (self.limit and self._vol_bytes and not linked and self._vol_bytes + size > self.limit): self._open_volume()
+        if arcname in self._names: return False
+        self._names.add(arcname)
+
+        if linked:
+            ti = tarfile.TarInfo(arcname)
+            ti.type = tarfile.LNKTYPE; ti.linkname = self._sources[key]
+            ti.mtime = int(os.path.getmtime(src))
+            self._arc.addfile(ti); self.linked += 1; self.files += 1
+            return True
+
+        if self.fmt == "Zip":
+            zi = zipfile.ZipInfo.from_file(src, arcname)
+            stored = Path(src).suffix.lower() in STORED_EXTENSIONS
+            zi.compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+            with open(src, 'rb') as fs, self._arc.open(zi, 'w', force_zip64=size > 2 ** 31) as fd:
+                shutil.copyfileobj(fs, fd, STREAM_CHUNK)
+        else:
+            ti = self._arc.gettarinfo(src, arcname)
+            with open(src, 'rb') as fs: self._arc.addfile(ti, fs)
+            self._sources[key] = arcname
+
+        self._vol_bytes = (self._arc.fp if self.fmt == "Zip" else self._arc.fileobj).tell()
+        self.bytes += size; self.files += 1
+        return True
+
+    def close(self):
+        self.close_volume()
+
+    def summary(self):
+        elapsed = max(0.001, time.time() - self._start)
+        mb = self.bytes / MB
+        out = sum(p.stat().st_size for p in self.volumes if p.exists()) / MB
+        linked = f", {self.linked} linked" if self.linked else ""
+        return f"{len(self.volumes)} volume(s), {self.files} files{linked}, {mb:.0f} MB in -> {out:.0f} MB out, {mb / elapsed:.1f} MB/s"
@@ -7,8 +7,14 @@ import logging
 import platform
 import shutil
 import time
+import gzip
+import queue
+import atexit
+import threading
+import multiprocessing
+import multiprocessing.util
 from pathlib import Path
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 from datetime import datetime
 
 if os.name == 'nt':
@@ -108,8 +114,35 @@ class Config:
         "ram_warning_mb": 1024, 
         "resize_width": 1920, 
         "log_level": "INFO",
+        "ui_fps": 20,
+        "log_max_mb": 5,
+        "log_backups": 5,
         "max_pixels": 500000000,
         "max_threads": 0, 
+        "exec_backend": "Auto",
+        "process_backend_min_files": 24,
+        "autoscale_workers": True,
+        "autoscale_min_workers": 1,
+        "autoscale_max_workers": 0,
+        "memory_budget_mb": 0,
+        "io_workers": 4,
+        "passthrough_mode": "Clone",
+        "file_timeout_s": 600,
+        "page_timeout_s": 300,
+        "timeout_retry_dpi": 150,
+        "triage_at_ingest": True,
+        "triage_timeout_s": 20,
+        "triage_huge_pages": 2000,
+        "triage_skip_huge": False,
+        "scratch_dir": "",
+        "scratch_fallback_dir": "",
+        "scratch_budget_mb": 1024,
+        "ext_src_prefer_ext": ".pdf",
+        "copy_workers": 8,
+        "delivery_mode": "Copy",
+        "delivery_materialize": "Auto",
+        "delivery_format": "Folder",
+        "delivery_volume_mb": 0,
         "default_export_prio": "Auto (Best Available)",
         "default_ingest_mode": "Standard", 
         "ocr_lang": "eng",
@@ -146,28 +179,109 @@ logger = logging.getLogger("DocRefine")
 logger.setLevel(getattr(logging, CFG.get("log_level").upper(), logging.INFO))
 c_handler = logging.StreamHandler()
 c_handler.setFormatter(logging.Formatter('[%(levelname)s] %(message)s'))
-logger.addHandler(c_handler)
+_handlers = [c_handler]
+_IS_MAIN = multiprocessing.current_process().name == 'MainProcess'
 
 try:
-    # FIX: mode='w' creates fresh logs every session
-    f_handler = RotatingFileHandler(LOG_PATH, maxBytes=1024*1024, backupCount=5, encoding='utf-8', mode='w')
+    # FIX: mode='w' creates fresh logs every session. Pool children append without rotating;
+    # only the main process rolls the file over (like EVENT_LOG below)
+    if _IS_MAIN: f_handler = RotatingFileHandler(LOG_PATH, maxBytes=1024*1024, backupCount=5, encoding='utf-8', mode='w')
+    else: f_handler = logging.FileHandler(LOG_PATH, mode='a', encoding='utf-8')
     f_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-    logger.addHandler(f_handler)
+    _handlers.append(f_handler)
 except: pass
 
+# Callers only enqueue the record; console and file output happen on the listener thread
+_log_queue = queue.SimpleQueue()
+logger.addHandler(QueueHandler(_log_queue))
+_listener = QueueListener(_log_queue, *_handlers, respect_handler_level=True)
+_listener.start()
+
+def _stop_listener():
+    # QueueListener.stop() fails on a second call; pool children also run atexit (they leave through sys.exit)
+    if _listener._thread is not None: _listener.stop()
+atexit.register(_stop_listener)
+
+# ==============================================================================
+#   STRUCTURED EVENT LOG
+# ==============================================================================
+class JsonlWriter:
+    """
+    Background writer for app_events.jsonl. log_app only enqueues the entry; one daemon thread
+    serializes and appends in batches (every FLUSH_S, or BATCH entries), rotates the file by size
+    into gzip-compressed backups (.1.gz newest) and drains the queue at exit.
+    Pool children append without rotating; only the main process rotates.
+    """
+    FLUSH_S = 0.5
+    BATCH = 1000
+
+    def __init__(self, path, max_mb=5, backups=5, rotate=True):
+        self.path = Path(path)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.backups = backups
+        self.rotate = rotate
+        self.q = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self._run, name="jsonl-log", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def put(self, entry): self.q.put(entry)
+
+    def flush(self, timeout=5):
+        """Blocks until everything enqueued so far is on disk."""
+        done = threading.Event(); self.q.put(done); done.wait(timeout)
+
+    def close(self, timeout=5):
+        if self.thread.is_alive(): self.q.put(None); self.thread.join(timeout)
+
+    def _rotate(self):
+        try:
+            for i in range(self.backups - 1, 0, -1):
+                src = self.path.with_name(f"{self.path.name}.{i}.gz")
+                if src.exists(): os.replace(src, self.path.with_name(f"{self.path.name}.{i+1}.gz"))
+            if self.backups > 0:
+                with open(self.path, 'rb') as fs, gzip.open(self.path.with_name(f"{self.path.name}.1.gz"), 'wb') as fd: shutil.copyfileobj(fs, fd)
+            os.unlink(self.path)
+        except OSError as e: print(f"Log Rotate Error: {e}")
+
+    def _write(self, batch):
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(e, default=str) + "\n" for e in batch))
+                size = f.tell()
+            if self.rotate and self.max_bytes and size >= self.max_bytes: self._rotate()
+        except: pass
+
+    def _run(self):
+        while True:
+            try: item = self.q.get(timeout=self.FLUSH_S)
+            except queue.Empty: continue
+            batch = []; waiters = []; stop = False
+            while True:
+                if item is None: stop = True
+                elif isinstance(item, threading.Event): waiters.append(item)
+                else: batch.append(item)
+                if stop or len(batch) >= self.BATCH: break
+                try: item = self.q.get_nowait()
+                except queue.Empty: break
+            if batch: self._write(batch)
+            for w in waiters: w.set()
+            if stop: return
+
+EVENT_LOG = JsonlWriter(JSON_LOG_PATH, float(CFG.get("log_max_mb")), int(CFG.get("log_backups")), rotate=_IS_MAIN)
+if not _IS_MAIN: multiprocessing.util.Finalize(None, EVENT_LOG.close, exitpriority=1)
+_OS_NAME = platform.system()
+
 def log_app(msg, level="INFO", structured_data=None):
     if level == "ERROR": logger.error(msg)
     elif level == "WARN": logger.warning(msg)
     else: logger.info(msg)
-    try:
-        entry = {
-            "timestamp": datetime.now().isoformat(),
-            "level": level,
-            "message": msg,
-            "os": platform.system(),
-            "version": SystemUtils.CURRENT_VERSION
-        }
-        if structured_data: entry.update(structured_data)
-        with open(JSON_LOG_PATH, "a", encoding="utf-8") as f:
-            f.write(json.dumps(entry) + "\n")
-    except: pass
\ No newline at end of file
+    entry = {
+        "timestamp": datetime.now().isoformat(),
+        "level": level,
+        "message": msg,
+        "os": _OS_NAME,
+        "version": SystemUtils.CURRENT_VERSION
+    }
+    if structured_data: entry.update(structured_data)
+    EVENT_LOG.put(entry)
@@ -0,0 +1,64 @@
+# SAVE AS: docrefine/core/bus.py
+import sys
+import threading
+from .events import AppEvent, EventType
+
+# Superseded by the next update of the same kind (LOG is batched, never dropped)
+COALESCED = {EventType.PROGRESS_MAIN, EventType.SLOT_UPDATE, EventType.LOG}
+
+class EventBus:
+    """
+    Sits between Worker.emit and the UI sink and delivers at a fixed frame rate.
+    Per frame the sink gets one LOG_BATCH with every log line since the last frame, the latest
+    SLOT_UPDATE for each slot and the latest PROGRESS_MAIN; intermediate updates are dropped.
+    Every other event (WORKER_CONFIG, STATUS_CHANGE, JOB_DATA, NOTIFICATION, ERROR, DONE) is
+    delivered right away, after whatever was queued before it, so nothing overtakes it and it
+    is never dropped. The sink is only ever called from one thread at a time.
+    """
+    def __init__(self, sink, fps=20):
+        self.sink = sink
+        self.interval = 1.0 / max(1, fps)
+        self.lock = threading.Lock()
+        self.deliver_lock = threading.Lock()
+        self.logs = []
+        self.slots = {}
+        self.progress = None
+        self._closed = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="event-bus", daemon=True)
+        self.thread.start()
+
+    def publish(self, event: AppEvent):
+        """Worker callback; safe from any thread."""
+        if event.type in COALESCED:
+            with self.lock:
+                if event.type == EventType.LOG: self.logs.append(event.payload)
+                elif event.type == EventType.PROGRESS_MAIN: self.progress = event
+                else: self.slots[event.payload.get('tid')] = event
+            return
+        with self.deliver_lock:
+            self._drain()
+            self._deliver(event)
+
+    def _deliver(self, event):
+        try: self.sink(event)
+        except Exception as e: print(f"Event Sink Error: {e}", file=sys.stderr)
+
+    def _drain(self):
+        with self.lock:
+            logs, self.logs = self.logs, []
+            slots, self.slots = self.slots, {}
+            progress, self.progress = self.progress, None
+        if len(logs) == 1: self._deliver(AppEvent(EventType.LOG, logs[0]))
+        elif logs: self._deliver(AppEvent(EventType.LOG_BATCH, logs))
+        for ev in slots.values(): self._deliver(ev)
+        if progress is not None: self._deliver(progress)
+
+    def _run(self):
+        while not self._closed.wait(self.interval):
+            with self.deliver_lock: self._drain()
+
+    def flush(self):
+        with self.deliver_lock: self._drain()
+
+    def close(self):
+        self._closed.set(); self.flush()
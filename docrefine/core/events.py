@@ -5,6 +5,7 @@ from typing import Any, Optional
 
 class EventType(Enum):
     LOG = auto()
+    LOG_BATCH = auto()      # Several LOG payloads in one delivery (EventBus)
     PROGRESS_MAIN = auto()
     SLOT_UPDATE = auto()    # Individual thread update
     WORKER_CONFIG = auto()  # Setup thread slots
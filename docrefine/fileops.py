@@ -0,0 +1,195 @@
+# SAVE AS: docrefine/fileops.py
+import os
+import sys
+import time
+import shutil
+import threading
+import concurrent.futures
+
+from .scheduler import TaskDispatcher
+
+# ==============================================================================
+#   CLONE / LINK
+# ==============================================================================
+# Linux FICLONE ioctl (_IOW(0x94, 9, int)): copy-on-write clone on btrfs, XFS (reflink=1), bcachefs
+FICLONE = 0x40049409
+PLACE_MODES = ("Clone", "Hardlink", "Copy")
+
+def reflink(src, dst):
+    """Copy-on-write clone of src at dst. Raises OSError where the filesystem cannot clone."""
+    if not sys.platform.startswith("linux"): raise OSError("reflink not supported on this platform")
+    import fcntl
+    with open(src, 'rb') as s, open(dst, 'wb') as d:
+        try: fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        except OSError:
+            d.close(); os.unlink(dst); raise
+    shutil.copystat(src, dst)
+
+def place_file(src, dst, mode="Clone"):
+    """
+    Puts an unchanged copy of src at dst as cheaply as the filesystem allows.
+    Clone: reflink, else a full copy. Hardlink: hard link, else reflink, else a full copy.
+    Returns the method that actually worked ('reflink', 'hardlink' or 'copy').
+    """
+    if mode == "Hardlink":
+        try: os.link(src, dst); return "hardlink"
+        except OSError: pass
+    if mode in {"Clone", "Hardlink"}:
+        try: reflink(src, dst); return "reflink"
+        except (OSError, ImportError): pass
+    shutil.copy2(src, dst)
+    return "copy"
+
+LINK_METHODS = ("reflink", "hardlink", "symlink")
+
+def link_file(src, dst, method):
+    """Creates dst as a link of the given kind to src, replacing whatever is there. Symlinks are relative."""
+    dst.unlink(missing_ok=True)
+    if method == "reflink": reflink(src, dst)
+    elif method == "hardlink": os.link(src, dst)
+    elif method == "symlink": os.symlink(os.path.relpath(src, dst.parent), dst)
+    else: raise ValueError(f"Unknown link method: {method}")
+    return 0
+
+def probe_link_method(d, methods=LINK_METHODS):
+    """First link method that works inside directory d (reflinks are preferred: they stay independent files)."""
+    d.mkdir(parents=True, exist_ok=True)
+    a = d / f".linkprobe_{os.getpid()}"
+    try:
+        a.write_bytes(b"probe")
+        for m in methods:
+            b = d / f".linkprobe_{os.getpid()}_{m}"
+            try: link_file(a, b, m); return m
+            except (OSError, ImportError): pass
+            finally: b.unlink(missing_ok=True)
+    except OSError: pass
+    finally: a.unlink(missing_ok=True)
+    return None
+
+def is_removable(path):
+    """Best effort: FAT/exFAT volumes, drives psutil flags as removable, and typical external mount points."""
+    try: import psutil
+    except ImportError: return False
+    path = os.path.realpath(path); best = None
+    try:
+        for part in psutil.disk_partitions(all=False):
+            mp = part.mountpoint
+            # Whole components only: /media/usb must not claim /media/usb2
+            if (path == mp or path.startswith(mp.rstrip(os.sep) + os.sep)) and (best is None or len(mp) > len(best.mountpoint)): best = part
+    except Exception: return False
+    if best is None: return False
+    return ('removable' in best.opts or best.fstype.lower() in {'vfat', 'fat', 'fat32', 'msdos', 'exfat'}
+            or best.mountpoint.startswith(('/media/', '/run/media/', '/Volumes/')))
+
+def bulk_place(pairs, mode="Clone", workers=4, stop_check=None, progress=None):
+    """
+    Places many (src, dst) pairs on a small I/O pool; existing targets are replaced.
+    Returns {src: (method, error)} for every pair that was attempted.
+    """
+    def one(src, dst):
+        try:
+            dst.unlink(missing_ok=True)
+            return place_file(src, dst, mode), None
+        except Exception as e: return None, str(e)
+
+    pairs = list(pairs)
+    for d in {dst.parent for _, dst in pairs}: d.mkdir(parents=True, exist_ok=True)
+    results = {}
+    workers = max(1, workers)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        dispatcher = TaskDispatcher(pairs, lambda p: executor.submit(one, *p), workers, queue_depth=workers)
+        for i, ((s, _), future) in enumerate(dispatcher.run(stop_check or (lambda: False))):
+            results[s] = future.result()
+            if progress: progress(i + 1, len(pairs))
+    return results
+
+# ==============================================================================
+#   COPY ENGINE
+# ==============================================================================
+COPY_CHUNK = 8 * 1024 * 1024
+
+def _kernel_copy(fs, fd, size):
+    """copy_file_range (server-side on NFS/SMB, reflink-aware), then sendfile. False if neither applies."""
+    for name in ("copy_file_range", "sendfile"):
+        if not hasattr(os, name): continue
+        off = 0
+        try:
+            while off < size:
+                if name == "copy_file_range": n = os.copy_file_range(fs, fd, min(size - off, 1 << 30), off, off)
+                else: n = os.sendfile(fd, fs, off, min(size - off, 1 << 30))
+                if n == 0: break
+                off += n
+            if off >= size: return True
+        except OSError: pass
+        os.lseek(fd, 0, os.SEEK_SET); os.ftruncate(fd, 0)
+    return False
+
+def fast_copy(src, dst, replace=False):
+    """copy2 equivalent that lets the kernel move the bytes, with 8 MB buffered reads as the fallback.
+    replace=True unlinks dst first, so an existing link is replaced instead of written through."""
+    if replace: dst.unlink(missing_ok=True)
+    with open(src, 'rb') as fs, open(dst, 'wb') as fd:
+        size = os.fstat(fs.fileno()).st_size
+        if not (size and _kernel_copy(fs.fileno(), fd.fileno(), size)):
+            shutil.copyfileobj(fs, fd, COPY_CHUNK)
+    shutil.copystat(src, dst)
+    return size
+
+class CopyEngine:
+    """
+    Parallel copier for organize/distribute. All target directories are created in one pass,
+    then (src, dst) jobs run on a thread pool. on_slot(text) is called from the worker thread
+    (throttled per thread) so each copier shows up in its own Active Workers slot. A metrics
+    registry, if given, counts every finished copy (files, bytes_out).
+    """
+    SLOT_INTERVAL = 0.25
+
+    def __init__(self, workers=8, copy_fn=fast_copy, on_slot=None, stop_check=None, pause_event=None, metrics=None):
+        self.workers = max(1, workers)
+        self.copy_fn = copy_fn
+        self.on_slot = on_slot
+        self.stop_check = stop_check or (lambda: False)
+        self.pause_event = pause_event
+        self.metrics = metrics
+        self.bytes = 0
+        self.files = 0
+        self.elapsed = 0.0
+        self.lock = threading.Lock()
+        self._local = threading.local()
+
+    def _one(self, src, dst):
+        if self.pause_event is not None: self.pause_event.wait()
+        if self.stop_check(): return None
+        now = time.time()
+        if self.on_slot and now - getattr(self._local, 'last', 0) > self.SLOT_INTERVAL:
+            self._local.last = now; self.on_slot(f"Copying: {dst.name}")
+        n = self.copy_fn(src, dst)
+        n = n if isinstance(n, int) else 0
+        with self.lock: self.bytes += n; self.files += 1
+        if self.metrics: self.metrics.inc(files=1, bytes_out=n)
+        return n
+
+    def run(self, jobs, progress=None):
+        """Copies every (src, dst) pair. Returns [(src, dst, error)] for the jobs that failed."""
+        jobs = list(jobs)
+        for d in {dst.parent for _, dst in jobs}: d.mkdir(parents=True, exist_ok=True)
+        failed = []
+        start = time.time()
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="copy")
+        try:
+            # Bounded window like the refine loop: at most 2x workers futures exist at a time
+            dispatcher = TaskDispatcher(jobs, lambda j: executor.submit(self._one, *j), self.workers, queue_depth=self.workers)
+            for i, (job, future) in enumerate(dispatcher.run(self.stop_check)):
+                try: future.result()
+                except Exception as e: failed.append((*job, str(e)))
+                if progress: progress(i + 1, len(jobs))
+        finally:
+            executor.shutdown(wait=True)
+            self.elapsed += time.time() - start
+        return failed
+
+    def summary(self):
+        if not self.bytes: return f"{self.files} files in {self.elapsed:.1f}s ({self.workers} workers)"
+        mb = self.bytes / (1024 * 1024)
+        rate = mb / self.elapsed if self.elapsed > 0 else 0
+        return f"{rate:.1f} MB/s ({self.files} files, {mb:.0f} MB in {self.elapsed:.1f}s, {self.workers} workers)"
@@ -10,7 +10,8 @@ from .dialogs import NewJobDialog, SettingsDialog, InternalViewerDialog
 from .qt_adapter import DocRefineAdapter
 from .forensic import ForensicDialog
 from docrefine.worker import Worker
-from docrefine.config import log_app, LOG_PATH, WORKSPACES_ROOT, SystemUtils
+from docrefine.core.bus import EventBus
+from docrefine.config import CFG, log_app, LOG_PATH, WORKSPACES_ROOT, SystemUtils
 
 def run():
     app = QApplication(sys.argv)
@@ -18,10 +19,13 @@ def run():
     
     window = MainWindow()
     adapter = DocRefineAdapter()
-    worker = Worker(callback=adapter.ingest_event)
+    # Progress/slot/log events are coalesced to ui_fps frames; ordered events pass straight through
+    bus = EventBus(adapter.ingest_event, int(CFG.get("ui_fps")))
+    worker = Worker(callback=bus.publish)
     
     # --- UI UPDATES ---
     adapter.sig_log.connect(window.update_log)
+    adapter.sig_log_batch.connect(window.update_log_batch)
     adapter.sig_progress_main.connect(window.update_progress)
     adapter.sig_status.connect(lambda s, m, c: window.update_status_label(s, m, c))
     
@@ -65,11 +69,9 @@ def run():
     def start_forensic(file_id):
         ws = window.job_tree.selectedItems()[0].data(0, Qt.UserRole)
         ws_path = Path(ws)
-        entry = None
-        for k, v in window.current_manifest.items():
-            if v.get('id') == file_id: entry = v; break
+        entry = window.current_manifest.by_id(file_id) if window.current_manifest is not None else None
         
-        if not entry: return
+        if not entry or 'uid' not in entry: return
         master = ws_path / "01_Master_Files" / entry['uid']
         dups = []
         if 'root' in entry:
@@ -98,6 +100,8 @@ def run():
     def delete_job(ws):
         if not ws: return
         if QMessageBox.question(window, "Confirm", "Delete this job?") == QMessageBox.Yes:
+            # The Inspector keeps manifest.db open; Windows will not delete an open file
+            if window.current_manifest is not None: window.current_manifest.close(); window.current_manifest = None
             try: shutil.rmtree(ws)
             except: pass
             window.refresh_job_list(None)
@@ -128,10 +132,9 @@ def run():
     def resolve_file_path(file_id):
         ws = get_selected_ws()
         if not ws: return None, "No job"
-        target = None
-        for k, v in window.current_manifest.items():
-            if v.get('id') == file_id: target = v; break
+        target = window.current_manifest.by_id(file_id) if window.current_manifest is not None else None
         if not target: return None, "ID not found"
+        if target.get('status') == 'QUARANTINE': return Path(ws) / "00_Quarantine" / target.get('q_file', ''), "Quarantined file"
         return Path(ws) / "01_Master_Files" / target['uid'], "OK"
 
     def on_inspector_open(file_id):
@@ -179,10 +182,11 @@ def run():
     window.btn_run_refine.clicked.connect(launch_refine)
     
     window.btn_preview.clicked.connect(lambda: start_process(worker.run_preview, (get_selected_ws(), [150,300,600][window.cb_dpi.currentIndex()])))
-    window.btn_org.clicked.connect(lambda: start_process(worker.run_organize, (get_selected_ws(), window.cb_prio.currentText())))
-    window.btn_dist.clicked.connect(lambda: start_process(worker.run_distribute, (get_selected_ws(), None, window.cb_prio.currentText())))
+    window.btn_org.clicked.connect(lambda: start_process(worker.run_organize, (get_selected_ws(), window.cb_prio.currentText()), multi_threaded=True))
+    window.btn_dist.clicked.connect(lambda: start_process(worker.run_distribute, (get_selected_ws(), None, window.cb_prio.currentText()), multi_threaded=True))
     window.btn_csv.clicked.connect(lambda: start_process(worker.run_full_export, (get_selected_ws(),)))
 
     window.refresh_job_list()
     window.show()
+    app.aboutToQuit.connect(bus.close)
     sys.exit(app.exec())
\ No newline at end of file
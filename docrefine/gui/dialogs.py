@@ -11,6 +11,7 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import Qt, QSize
 from PySide6.QtGui import QFont, QColor, QPalette
 from docrefine.config import CFG, SystemUtils
+from docrefine.fileops import PLACE_MODES
 
 # --- HELPER: Tesseract ---
 def get_tesseract_langs():
@@ -71,9 +72,9 @@ class NewJobDialog(QDialog):
         
         self.bg = QButtonGroup(self)
         self.modes = [
-            ("Standard (Recommended)", "Smart Text Hash (PDFs).\nStrict Binary Hash (Others).", "Standard"),
+            ("Standard (Recommended)", "Smart Text Hash (PDFs).\nSmart Structure Hash (DOCX/XLSX).\nStrict Binary Hash (Others).", "Standard"),
             ("Lightning (Fastest)", "Strict Binary Hash (All Files).\nExact digital copies only.", "Lightning"),
-            ("Deep Scan (Slowest)", "Full Text Scan (PDFs).\nStrict Binary Hash (Others).", "Deep")
+            ("Deep Scan (Slowest)", "Full Text Scan (PDFs).\nSmart Structure Hash (DOCX/XLSX).\nStrict Binary Hash (Others).", "Deep")
         ]
         
         for text, desc, val in self.modes:
@@ -129,6 +130,47 @@ class SettingsDialog(QDialog):
         gl_perf.addWidget(QLabel("Safety Cap (Max Pixels):"), 1, 0)
         self.txt_pixels = QLineEdit(str(CFG.get("max_pixels")))
         gl_perf.addWidget(self.txt_pixels, 1, 1)
+        
+        gl_perf.addWidget(QLabel("Execution Backend:"), 2, 0)
+        self.cb_backend = QComboBox()
+        self.cb_backend.addItems(["Auto", "Threads", "Processes"])
+        self.cb_backend.setCurrentText(CFG.get("exec_backend"))
+        gl_perf.addWidget(self.cb_backend, 2, 1)
+        
+        gl_perf.addWidget(QLabel("Autoscale Ceiling (0=All Cores):"), 3, 0)
+        self.spin_autoscale = QSpinBox()
+        self.spin_autoscale.setRange(0, 256)
+        self.spin_autoscale.setValue(int(CFG.get("autoscale_max_workers")))
+        gl_perf.addWidget(self.spin_autoscale, 3, 1)
+        
+        gl_perf.addWidget(QLabel("Passthrough Files:"), 4, 0)
+        self.cb_passthrough = QComboBox()
+        self.cb_passthrough.addItems(list(PLACE_MODES))
+        self.cb_passthrough.setCurrentText(CFG.get("passthrough_mode"))
+        gl_perf.addWidget(self.cb_passthrough, 4, 1)
+        
+        gl_perf.addWidget(QLabel("File Timeout Base (s, 0=Off):"), 5, 0)
+        self.spin_timeout = QSpinBox()
+        self.spin_timeout.setRange(0, 86400)
+        self.spin_timeout.setValue(int(CFG.get("file_timeout_s")))
+        gl_perf.addWidget(self.spin_timeout, 5, 1)
+        
+        gl_perf.addWidget(QLabel("Scratch Folder (blank=Auto):"), 6, 0)
+        self.txt_scratch = QLineEdit(str(CFG.get("scratch_dir")))
+        self.txt_scratch.setPlaceholderText("tmpfs / local SSD")
+        gl_perf.addWidget(self.txt_scratch, 6, 1)
+        
+        gl_perf.addWidget(QLabel("Delivery Duplicates:"), 7, 0)
+        self.cb_delivery = QComboBox()
+        self.cb_delivery.addItems(["Copy", "Link"])
+        self.cb_delivery.setCurrentText(CFG.get("delivery_mode"))
+        gl_perf.addWidget(self.cb_delivery, 7, 1)
+        
+        gl_perf.addWidget(QLabel("Delivery Format:"), 8, 0)
+        self.cb_delivery_fmt = QComboBox()
+        self.cb_delivery_fmt.addItems(["Folder", "Zip", "Tar"])
+        self.cb_delivery_fmt.setCurrentText(CFG.get("delivery_format"))
+        gl_perf.addWidget(self.cb_delivery_fmt, 8, 1)
         layout.addWidget(gb_perf)
         
         # Defaults
@@ -211,6 +253,13 @@ class SettingsDialog(QDialog):
         try:
             CFG.set("max_pixels", int(self.txt_pixels.text()))
         except: pass
+        CFG.set("exec_backend", self.cb_backend.currentText())
+        CFG.set("autoscale_max_workers", self.spin_autoscale.value())
+        CFG.set("passthrough_mode", self.cb_passthrough.currentText())
+        CFG.set("file_timeout_s", self.spin_timeout.value())
+        CFG.set("scratch_dir", self.txt_scratch.text().strip())
+        CFG.set("delivery_mode", self.cb_delivery.currentText())
+        CFG.set("delivery_format", self.cb_delivery_fmt.currentText())
         CFG.set("default_ingest_mode", self.cb_ingest.currentText())
         CFG.set("default_export_prio", self.cb_export.currentText())
         
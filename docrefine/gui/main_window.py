@@ -12,6 +12,7 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import Qt, Slot, Signal, QTimer
 from PySide6.QtGui import QColor
 from docrefine.config import WORKSPACES_ROOT
+from docrefine.manifest import ManifestStore
 
 class NumericTreeWidgetItem(QTreeWidgetItem):
     def __lt__(self, other):
@@ -30,7 +31,7 @@ class MainWindow(QMainWindow):
         super().__init__()
         self.setWindowTitle("DocRefine Pro (PySide6 Era)")
         self.resize(1300, 900)
-        self.current_manifest = {}
+        self.current_manifest = None
         
         # Timer
         self.timer = QTimer()
@@ -331,7 +332,8 @@ class MainWindow(QMainWindow):
         self.gb_stats.setVisible(enabled)
         self.btn_delete.setEnabled(enabled)
         self.insp_tree.clear()
-        self.current_manifest = {}
+        if self.current_manifest is not None: self.current_manifest.close()
+        self.current_manifest = None
         if enabled:
             path_str = items[0].data(0, Qt.UserRole)
             if not path_str: return
@@ -340,9 +342,9 @@ class MainWindow(QMainWindow):
             self.load_stats(ws_path)
             rpt_dir = ws_path / "04_Reports"
             self.btn_receipt.setEnabled(rpt_dir.exists() and any(rpt_dir.glob("*.html")))
-            if (ws_path / "manifest.json").exists():
+            if ManifestStore.available(ws_path):
                 try: 
-                    with open(ws_path / "manifest.json") as f: self.current_manifest = json.load(f)
+                    self.current_manifest = ManifestStore.open(ws_path)
                     self.filter_inspector("")
                 except: pass
         else:
@@ -385,16 +387,16 @@ class MainWindow(QMainWindow):
 
     def filter_inspector(self, text):
         self.insp_tree.clear()
-        query = text.lower()
-        for k, v in self.current_manifest.items():
-            name = v.get('name', '').lower()
-            if query in name or query in v.get('id','').lower():
-                st = "Duplicate" if len(v.get('copies', []))>1 else "Master"
-                if v.get('status') == 'QUARANTINE': st = "⛔ Quarantined"
-                item = NumericTreeWidgetItem([v.get('id','?'), v.get('name','?'), st, str(len(v.get('copies',[])))])
-                if "Quar" in st: item.setForeground(2, QColor("#e74c3c"))
-                elif "Dup" in st: item.setForeground(2, QColor("#3498db"))
-                self.insp_tree.addTopLevelItem(item)
+        if self.current_manifest is None: return
+        for k, v in self.current_manifest.search(text):
+            st = "Duplicate" if len(v.get('copies', []))>1 else "Master"
+            if v.get('status') == 'QUARANTINE': st = "⛔ Quarantined"
+            elif v.get('triage', {}).get('class') in {'ENCRYPTED', 'DAMAGED'}: st = f"⚠️ {v['triage']['class'].replace('_', ' ').title()}"
+            item = NumericTreeWidgetItem([v.get('id','?'), v.get('name','?'), st, str(len(v.get('copies',[])))])
+            if "Quar" in st: item.setForeground(2, QColor("#e74c3c"))
+            elif "Dup" in st: item.setForeground(2, QColor("#3498db"))
+            elif "⚠️" in st: item.setForeground(2, QColor("#e67e22"))
+            self.insp_tree.addTopLevelItem(item)
 
     # --- STATE ---
     def set_processing_state(self, active, multi_threaded=False):
@@ -460,9 +462,17 @@ class MainWindow(QMainWindow):
 
     @Slot(str, str)
     def update_log(self, msg, level):
+        self.log_box.append(self._log_html(msg, level))
+
+    @Slot(list)
+    def update_log_batch(self, lines):
+        self.log_box.append("<br>".join(self._log_html(p['msg'], p['level']) for p in lines))
+
+    @staticmethod
+    def _log_html(msg, level):
         c = "#ff5555" if level == "ERROR" else "#ccc"
         if level == "INFO": c = "#ddd"
-        self.log_box.append(f'<span style="color:{c}">[{level}] {msg}</span>')
+        return f'<span style="color:{c}">[{level}] {msg}</span>'
 
     @Slot(float, str)
     def update_progress(self, percent, text):
@@ -9,6 +9,7 @@ class DocRefineAdapter(QObject):
     
     # Define strongly-typed Qt Signals matching our Event Types
     sig_log = Signal(str, str)              # msg, level
+    sig_log_batch = Signal(list)            # [{msg, level}, ...]
     sig_progress_main = Signal(float, str)  # percent, text
     sig_slot_update = Signal(dict)          # {tid, text, percent}
     sig_worker_config = Signal(int)         # num_workers
@@ -32,6 +33,9 @@ class DocRefineAdapter(QObject):
         if event.type == EventType.LOG:
             self.sig_log.emit(p['msg'], p['level'])
             
+        elif event.type == EventType.LOG_BATCH:
+            self.sig_log_batch.emit(p)
+            
         elif event.type == EventType.PROGRESS_MAIN:
             self.sig_progress_main.emit(p['percent'], p['text'])
         
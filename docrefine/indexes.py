@@ -0,0 +1,145 @@
+# SAVE AS: docrefine/indexes.py
+import os
+import re
+from pathlib import Path
+
+# Auto priority order: most refined variant first
+REFINE_FOLDERS = ("OCR", "Flattened", "Resized", "Sanitized", "Standard")
+AUTO_PRIORITY = "Auto (Best Available)"
+
+# ==============================================================================
+#   SOURCE INDEX
+# ==============================================================================
+class FolderIndex:
+    """One os.scandir of a folder: exact-name lookups plus the first entry seen for each stem."""
+    def __init__(self, d):
+        self.names = {}
+        self.stems = {}
+        try:
+            with os.scandir(d) as it:
+                for e in it:
+                    p = Path(e.path)
+                    self.names[e.name] = p
+                    self.stems.setdefault(p.stem, p)
+        except OSError: pass
+
+    def find(self, name, stem):
+        return self.names.get(name) or self.stems.get(stem)
+
+class SourceIndex:
+    """
+    Best-source resolution for a whole organize/distribute run. The master folder and the five
+    refinement folders are listed once up front; every lookup after that is a dict hit.
+    Outputs written after the index is built are not seen.
+    """
+    def __init__(self, ws):
+        ws = Path(ws)
+        self.master_dir = ws / "01_Master_Files"
+        base = ws / "02_Ready_For_Redistribution"
+        self.masters = FolderIndex(self.master_dir)
+        self.folders = {sub: FolderIndex(base / sub) for sub in REFINE_FOLDERS}
+
+    def best(self, file_uid, priority_mode=AUTO_PRIORITY):
+        """Refined variant for one master uid under the given priority mode, falling back to the master."""
+        stem = Path(file_uid).stem
+        master = self.master_dir / file_uid
+
+        if "Force: OCR" in priority_mode: return self.folders["OCR"].find(file_uid, stem) or master
+        if "Force: Flattened" in priority_mode: return self.folders["Flattened"].find(file_uid, stem) or master
+        if "Force: Original" in priority_mode: return master
+
+        for sub in REFINE_FOLDERS:
+            f = self.folders[sub].find(file_uid, stem)
+            if f: return f
+        return self.masters.names.get(file_uid)
+
+# ==============================================================================
+#   PREFIX INDEX
+# ==============================================================================
+ID_PREFIX = re.compile(r"\[[^\]]+\]")
+
+class PrefixIndex:
+    """
+    External source folder (files renamed outside the app but still starting with their "[NNNN]" id)
+    indexed by that id in one os.scandir. When several files carry the same id, files with the
+    preferred extension win, then the most recently modified one.
+    """
+    def __init__(self, d, prefer_ext=""):
+        ext = (prefer_ext or "").strip().lower()
+        self.prefer_ext = ext if not ext or ext.startswith('.') else f".{ext}"
+        self.groups = {}
+        self.files = 0
+        with os.scandir(d) as it:
+            for e in it:
+                if not e.is_file(): continue
+                m = ID_PREFIX.match(e.name)
+                if not m: continue
+                self.files += 1
+                self.groups.setdefault(m.group(0), []).append(e)
+
+    @property
+    def ambiguous(self):
+        return [k for k, v in self.groups.items() if len(v) > 1]
+
+    def find(self, file_id):
+        entries = self.groups.get(file_id)
+        if not entries: return None
+        best = entries[0] if len(entries) == 1 else max(entries, key=lambda e: (Path(e.name).suffix.lower() == self.prefer_ext, e.stat().st_mtime))
+        return Path(best.path)
+
+# ==============================================================================
+#   NAME REGISTRY
+# ==============================================================================
+class NameRegistry:
+    """
+    Collision-free export names for one output folder, kept in memory (compared case-insensitively,
+    as on Windows/macOS volumes). Names a master got in the previous run are reserved for it, and
+    one listing of the folder reserves any other file already there. New names take the next free
+    "_N" suffix in manifest order, so repeated runs assign the same names.
+    """
+    def __init__(self, folder, previous=None):
+        self.previous = previous or {}
+        owned = {n.casefold() for n in self.previous.values()}
+        self.taken = set(owned)
+        self.counters = {}
+        try:
+            with os.scandir(folder) as it:
+                for e in it: self.taken.add(e.name.casefold())
+        except OSError: pass
+
+    def assign(self, key, name):
+        """Unique file name for the master `key` (uid) that wants to be called `name`."""
+        prev = self.previous.get(key)
+        if prev and Path(prev).suffix.lower() == Path(name).suffix.lower(): return prev
+        if name.casefold() not in self.taken:
+            self.taken.add(name.casefold()); return name
+        p = Path(name); base = p.stem.casefold() + p.suffix.lower()
+        ctr = self.counters.get(base, 1)
+        while f"{p.stem}_{ctr}{p.suffix}".casefold() in self.taken: ctr += 1
+        self.counters[base] = ctr + 1
+        new = f"{p.stem}_{ctr}{p.suffix}"
+        self.taken.add(new.casefold())
+        return new
+
+# ==============================================================================
+#   QUARANTINE INDEX
+# ==============================================================================
+UUID_PREFIX = re.compile(r"[0-9a-fA-F-]{36}_(.+)")
+
+class QuarantineIndex(FolderIndex):
+    """
+    00_Quarantine listed once. Manifest entries map to their file exactly through 'q_file';
+    entries ingested before that was recorded match on the exact name behind the uuid prefix.
+    """
+    def __init__(self, d):
+        super().__init__(d)
+        self.by_orig = {}
+        for name, p in self.names.items():
+            m = UUID_PREFIX.fullmatch(name)
+            if m: self.by_orig.setdefault(m.group(1), []).append(p)
+
+    def files_for(self, entry, safe_name):
+        if entry.get('q_file'):
+            p = self.names.get(entry['q_file'])
+            return [p] if p else []
+        return self.by_orig.get(safe_name, [])
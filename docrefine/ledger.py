@@ -0,0 +1,91 @@
+# SAVE AS: docrefine/ledger.py
+import json
+import time
+import hashlib
+from pathlib import Path
+from datetime import datetime
+
+from .planning import refine_outputs, options_hash
+from .wsmeta import workspace_lock, atomic_write_json
+
+class RefineLedger:
+    """
+    Per-workspace record of every refined output:
+    master fingerprint, processor action, options hash, output size/md5/mtime, duration.
+    A re-run only skips a master when all of its expected outputs match an entry exactly.
+    """
+    FILE_NAME = "refine_ledger.json"
+    SAVE_INTERVAL = 30
+
+    def __init__(self, ws):
+        self.ws = Path(ws)
+        self.path = self.ws / self.FILE_NAME
+        self.base = self.ws / "02_Ready_For_Redistribution"
+        self.entries = {}
+        self._dirty = False
+        self._last_save = time.time()
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f: self.entries = json.load(f)
+            except: self.entries = {}
+
+    @staticmethod
+    def master_fingerprint(path):
+        st = path.stat()
+        return f"{st.st_size}-{st.st_mtime_ns}"
+
+    def key(self, out): return out.relative_to(self.base).as_posix()
+
+    def is_current(self, master, options):
+        """True when every expected output exists unchanged and was made from this master with these options."""
+        action, _, outputs = refine_outputs(master, options, self.base)
+        fp = self.master_fingerprint(master)
+        oh = options_hash(action, options)
+        for out in outputs:
+            e = self.entries.get(self.key(out))
+            if not e or e.get('master_fp') != fp or e.get('processor') != (action or "copy") or e.get('options_hash') != oh: return False
+            try: st = out.stat()
+            except OSError: return False
+            if st.st_size != e.get('size') or st.st_mtime_ns != e.get('mtime_ns'): return False
+        return True
+
+    def output_size(self, master, options):
+        _, _, outputs = refine_outputs(master, options, self.base)
+        return sum(self.entries[self.key(o)]['size'] for o in outputs)
+
+    def record(self, records):
+        self.entries.update(records); self._dirty = True
+        if time.time() - self._last_save > self.SAVE_INTERVAL: self.save()
+
+    def forget(self, master, options):
+        _, _, outputs = refine_outputs(master, options, self.base)
+        for o in outputs:
+            if self.entries.pop(self.key(o), None) is not None: self._dirty = True
+
+    def save(self):
+        if not self._dirty: return
+        try:
+            with workspace_lock(self.ws): atomic_write_json(self.path, self.entries, indent=1, encoding='utf-8')
+            self._dirty = False; self._last_save = time.time()
+        except Exception as e: print(f"Ledger Save Error: {e}")
+
+def build_records(master, action, options, outputs, base, duration, digest=True):
+    """Ledger entries for freshly written outputs. Runs in the batch's verify stage (parent process).
+    Passthrough outputs are byte-identical to the master and skip the MD5 (digest=False)."""
+    fp = RefineLedger.master_fingerprint(master)
+    oh = options_hash(action, options)
+    records = {}
+    for out in outputs:
+        if not out.exists(): continue
+        h = None
+        if digest:
+            h = hashlib.md5()
+            with open(out, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""): h.update(chunk)
+        st = out.stat()
+        records[out.relative_to(base).as_posix()] = {
+            "master": master.name, "master_fp": fp, "processor": action or "copy", "options_hash": oh,
+            "size": st.st_size, "mtime_ns": st.st_mtime_ns, "md5": h.hexdigest() if h else None,
+            "duration": round(duration, 3), "refined_at": datetime.now().isoformat(timespec='seconds')
+        }
+    return records
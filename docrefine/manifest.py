@@ -0,0 +1,282 @@
+# SAVE AS: docrefine/manifest.py
+import os
+import sys
+import json
+import sqlite3
+import threading
+from array import array
+from pathlib import Path
+
+from .wsmeta import workspace_lock, atomic_open
+
+DB_NAME = "manifest.db"
+JSON_NAME = "manifest.json"
+# Keys with their own columns/tables; everything else in an entry (triage, q_file, ...) is kept as JSON
+_MASTER_COLS = ("id", "uid", "name", "master", "root")
+_COLUMN_KEYS = set(_MASTER_COLS) | {"copies", "status", "error_reason", "fingerprint"}
+BATCH = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS masters (seq INTEGER PRIMARY KEY, key TEXT UNIQUE NOT NULL, id TEXT, uid TEXT, name TEXT, master TEXT, root TEXT, extra TEXT);
+CREATE TABLE IF NOT EXISTS copies (seq INTEGER NOT NULL, path TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS fingerprints (seq INTEGER PRIMARY KEY, hash TEXT NOT NULL, method TEXT);
+CREATE TABLE IF NOT EXISTS statuses (seq INTEGER PRIMARY KEY, status TEXT, reason TEXT, triage TEXT);
+CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT);
+CREATE INDEX IF NOT EXISTS ix_masters_id ON masters(id);
+CREATE INDEX IF NOT EXISTS ix_masters_uid ON masters(uid);
+CREATE INDEX IF NOT EXISTS ix_masters_name ON masters(name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS ix_copies_seq ON copies(seq);
+CREATE INDEX IF NOT EXISTS ix_fp_hash ON fingerprints(hash);
+CREATE INDEX IF NOT EXISTS ix_status ON statuses(status);
+CREATE INDEX IF NOT EXISTS ix_triage ON statuses(triage);
+"""
+
+# ==============================================================================
+#   MANIFEST STORE
+# ==============================================================================
+class ManifestStore:
+    """
+    Workspace manifest in SQLite (manifest.db): masters, copies, fingerprints and statuses in
+    manifest order, with indexes on id, uid, name and hash. Entries go in and come out as the
+    same dicts manifest.json holds, keyed by hash (uuid for quarantine entries).
+    manifest.json stays the interchange format: open() imports it when the database is missing
+    or the JSON was changed by something else, and export_json() streams it back out.
+    """
+    def __init__(self, ws):
+        self.ws = Path(ws)
+        self.path = self.ws / DB_NAME
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        # Rollback journal, not WAL: WAL needs shared memory, which NAS/SMB workspaces cannot provide safely.
+        # Set explicitly so databases created in WAL mode by earlier builds are switched back.
+        try: self.db.execute("PRAGMA journal_mode=DELETE")
+        except sqlite3.DatabaseError: pass
+        self.db.executescript(SCHEMA)
+
+    @staticmethod
+    def available(ws):
+        return (Path(ws) / DB_NAME).exists() or (Path(ws) / JSON_NAME).exists()
+
+    @classmethod
+    def open(cls, ws):
+        """Store for a workspace, (re)importing manifest.json if it is newer than what the database holds."""
+        store = cls(ws)
+        js = store.ws / JSON_NAME
+        if js.exists() and store.meta("json_mtime") != str(js.stat().st_mtime_ns): store.import_json(js)
+        return store
+
+    def close(self):
+        with self.lock: self.db.close()
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+
+    def meta(self, k, v=None):
+        with self.lock:
+            if v is None:
+                row = self.db.execute("SELECT v FROM meta WHERE k=?", (k,)).fetchone()
+                return row[0] if row else None
+            with self.db: self.db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (k, str(v)))
+
+    def __len__(self):
+        with self.lock: return self.db.execute("SELECT COUNT(*) FROM masters").fetchone()[0]
+
+    # --- WRITE ---
+    def _insert(self, key, e):
+        cur = self.db.execute("INSERT OR REPLACE INTO masters (key, id, uid, name, master, root, extra) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                              (key, *(e.get(c) for c in _MASTER_COLS), json.dumps({k: v for k, v in e.items() if k not in _COLUMN_KEYS})))
+        seq = cur.lastrowid
+        self.db.executemany("INSERT INTO copies VALUES (?, ?)", ((seq, c) for c in e.get('copies', [])))
+        if e.get('status') != 'QUARANTINE': self.db.execute("INSERT INTO fingerprints VALUES (?, ?, ?)", (seq, key, e.get('fingerprint')))
+        self.db.execute("INSERT INTO statuses VALUES (?, ?, ?, ?)", (seq, e.get('status'), e.get('error_reason'), (e.get('triage') or {}).get('class')))
+
+    def write(self, entries):
+        """Replaces the whole manifest with the (key, entry) pairs, in order."""
+        with self.lock, self.db:
+            for t in ("masters", "copies", "fingerprints", "statuses"): self.db.execute(f"DELETE FROM {t}")
+            for key, e in entries: self._insert(key, e)
+
+    def update(self, entries):
+        """Rewrites existing entries in place (same key, same manifest position)."""
+        with self.lock, self.db:
+            for key, e in entries:
+                row = self.db.execute("SELECT seq FROM masters WHERE key=?", (key,)).fetchone()
+                if not row: self._insert(key, e); continue
+                seq = row[0]
+                self.db.execute("UPDATE masters SET id=?, uid=?, name=?, master=?, root=?, extra=? WHERE seq=?",
+                                (*(e.get(c) for c in _MASTER_COLS), json.dumps({k: v for k, v in e.items() if k not in _COLUMN_KEYS}), seq))
+                self.db.execute("DELETE FROM copies WHERE seq=?", (seq,))
+                self.db.executemany("INSERT INTO copies VALUES (?, ?)", ((seq, c) for c in e.get('copies', [])))
+                self.db.execute("UPDATE statuses SET status=?, reason=?, triage=? WHERE seq=?",
+                                (e.get('status'), e.get('error_reason'), (e.get('triage') or {}).get('class'), seq))
+
+    # --- READ ---
+    _SELECT = ("SELECT m.seq, m.key, m.id, m.uid, m.name, m.master, m.root, m.extra, s.status, s.reason, f.method "
+               "FROM masters m LEFT JOIN statuses s ON s.seq=m.seq LEFT JOIN fingerprints f ON f.seq=m.seq")
+
+    @staticmethod
+    def _entry(row, copies):
+        seq, key, *cols, extra, status, reason, method = row
+        e = json.loads(extra) if extra else {}
+        e.update({c: v for c, v in zip(_MASTER_COLS, cols) if v is not None})
+        e['copies'] = copies
+        if status is not None: e['status'] = status
+        if reason is not None: e['error_reason'] = reason
+        if method is not None: e['fingerprint'] = method
+        return key, e
+
+    def items(self, sub=None, args=()):
+        """Streams (key, entry) in manifest order. Masters and copies are read as two ordered cursors
+        and merged, BATCH rows at a time, so memory does not grow with the manifest.
+        sub: optional "SELECT seq ..." subquery; both cursors are limited to the seqs it returns."""
+        with self.lock:
+            db = sqlite3.connect(str(self.path), timeout=30)
+        try:
+            rows = db.execute(f"{self._SELECT} {f'WHERE m.seq IN ({sub})' if sub else ''} ORDER BY m.seq", args)
+            cps = db.execute(f"SELECT seq, path FROM copies {f'WHERE seq IN ({sub})' if sub else ''} ORDER BY seq, rowid", args)
+            pending = cps.fetchone()
+            while True:
+                batch = rows.fetchmany(BATCH)
+                if not batch: break
+                for row in batch:
+                    seq = row[0]; copies = []
+                    while pending and pending[0] < seq: pending = cps.fetchone()
+                    while pending and pending[0] == seq:
+                        copies.append(pending[1]); pending = cps.fetchone()
+                    yield self._entry(row, copies)
+        finally: db.close()
+
+    def values(self):
+        for _, e in self.items(): yield e
+
+    def _one(self, where, args):
+        with self.lock:
+            row = self.db.execute(f"{self._SELECT} {where} LIMIT 1", args).fetchone()
+            if not row: return None
+            copies = [r[0] for r in self.db.execute("SELECT path FROM copies WHERE seq=? ORDER BY rowid", (row[0],))]
+        return self._entry(row, copies)[1]
+
+    def by_id(self, file_id): return self._one("WHERE m.id=?", (file_id,))
+
+    def search(self, text, limit=None):
+        """Entries whose name or id contains text (case-insensitive), for the Inspector."""
+        # LIKE wildcards in the query are literal ("_v2" must not match "av2")
+        q = "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        sub = "SELECT seq FROM masters WHERE name LIKE ? ESCAPE '\\' OR id LIKE ? ESCAPE '\\' ORDER BY seq" + (f" LIMIT {int(limit)}" if limit else "")
+        return self.items(sub, (q, q))
+
+    # --- JSON INTERCHANGE ---
+    def import_json(self, path=None):
+        path = Path(path or self.ws / JSON_NAME)
+        with open(path) as f: man = json.load(f)
+        self.write(man.items())
+        self.meta("json_mtime", path.stat().st_mtime_ns)
+        return len(man)
+
+    def export_json(self, path=None):
+        """Writes manifest.json (same schema and indent as always) one entry at a time."""
+        path = Path(path or self.ws / JSON_NAME)
+        with workspace_lock(path.parent), atomic_open(path) as f:
+            sep = "\n"
+            f.write("{")
+            for key, e in self.items():
+                f.write(f"{sep}    {json.dumps(key)}: " + json.dumps(e, indent=4).replace("\n", "\n    "))
+                sep = ",\n"
+            f.write("\n}" if sep != "\n" else "}")
+        self.meta("json_mtime", path.stat().st_mtime_ns)
+
+# ==============================================================================
+#   COMPACT INGEST MANIFEST
+# ==============================================================================
+class PathPool:
+    """
+    Relative paths stored as a trie of interned folder components: each folder is one
+    (parent, name) node and each path is a (folder, file name) pair, so deep trees that repeat
+    the same folder and file names cost a few bytes per path instead of a full string.
+    """
+    def __init__(self):
+        self.node_parent = array('i')
+        self.node_name = []
+        self.nodes = {}
+        self.path_dir = array('i')
+        self.path_name = []
+
+    def _folder(self, parts):
+        node = -1
+        for part in parts:
+            key = (node, part)
+            nid = self.nodes.get(key)
+            if nid is None:
+                nid = self.nodes[key] = len(self.node_name)
+                self.node_parent.append(node); self.node_name.append(sys.intern(part))
+            node = nid
+        return node
+
+    def __len__(self): return len(self.path_name)
+
+    def add(self, rel):
+        """Interns one relative path (os.sep separated); returns its id."""
+        head, _, tail = rel.rpartition(os.sep)
+        self.path_dir.append(self._folder(head.split(os.sep)) if head else -1)
+        self.path_name.append(sys.intern(tail))
+        return len(self.path_name) - 1
+
+    def get(self, pid):
+        parts = [self.path_name[pid]]
+        node = self.path_dir[pid]
+        while node >= 0:
+            parts.append(self.node_name[node]); node = self.node_parent[node]
+        return os.sep.join(reversed(parts))
+
+class CompactManifest:
+    """
+    Ingest-time manifest held in columns indexed by master number (ingest order): the digest
+    (as 16 raw bytes) maps to that number, the first copy is an int in one array, and further
+    copies hang off it as a linked list in one shared array of path ids, so a master costs no
+    per-record objects. items() yields entries in the manifest.json schema, one at a time, for
+    ManifestStore.write. Pass the PathPool the scan was listed into, so copies reuse its ids.
+    """
+    def __init__(self, root, paths=None):
+        self.root = str(root)
+        self.paths = paths if paths is not None else PathPool()
+        self.index = {}
+        self.first = array('i')
+        self.last = array('i')
+        self.next = array('i')
+        self.names = []
+        self.fingerprints = []
+        self.uids = []
+        self.ids = []
+        self.triage = []
+
+    def __len__(self): return len(self.names)
+
+    def add(self, h, pid, name, fingerprint=None):
+        """Records one file (path id): a new master, or another copy of the master with this fingerprint hash."""
+        if len(self.next) <= pid: self.next.extend([-1] * (pid + 1 - len(self.next)))
+        key = bytes.fromhex(h)
+        n = self.index.get(key)
+        if n is None:
+            self.index[key] = len(self.names)
+            self.first.append(pid); self.last.append(pid)
+            self.names.append(sys.intern(name)); self.fingerprints.append(fingerprint and sys.intern(fingerprint))
+            self.uids.append(None); self.ids.append(None); self.triage.append(None)
+        else:
+            self.next[self.last[n]] = pid; self.last[n] = pid
+
+    def copies(self, n):
+        """Path ids of master n's copies, master first."""
+        pid = self.first[n]
+        while pid >= 0:
+            yield pid; pid = self.next[pid]
+
+    def entry(self, n):
+        copies = [self.paths.get(p) for p in self.copies(n)]
+        e = {'master': copies[0], 'copies': copies, 'name': self.names[n], 'root': self.root}
+        if self.fingerprints[n]: e['fingerprint'] = self.fingerprints[n]
+        if self.uids[n] is not None: e['uid'] = self.uids[n]; e['id'] = self.ids[n]
+        if self.triage[n] is not None: e['triage'] = self.triage[n]
+        return e
+
+    def items(self):
+        for key, n in self.index.items(): yield key.hex(), self.entry(n)
@@ -0,0 +1,107 @@
+# SAVE AS: docrefine/metrics.py
+import os
+import time
+import threading
+
+from .core.events import AppEvent, EventType
+
+MB = 1024 * 1024
+COUNTERS = ("files", "pages", "bytes_in", "bytes_out")
+SAMPLE_S = 0.1
+
+class _SlotHandle:
+    """Lives in a thread's local storage; hands the slot back when the thread ends."""
+    __slots__ = ('registry', 'n')
+    def __init__(self, registry, n): self.registry = registry; self.n = n
+    def __del__(self):
+        try: self.registry._release(self.n)
+        except Exception: pass
+
+# ==============================================================================
+#   METRICS REGISTRY
+# ==============================================================================
+class MetricsRegistry:
+    """
+    One per Worker (so one per pool child process too). Threads get small fixed slot ids
+    ("<pid>-<n>", lowest free n, reused once a thread exits) and only store their latest slot
+    text; a sampler thread turns changed slots into SLOT_UPDATE events every SAMPLE_S.
+    Counters (files, pages, bytes_in, bytes_out) are atomic under one lock; summary() turns
+    them into the totals and average rates the receipts report.
+    """
+    def __init__(self, emit, interval=SAMPLE_S):
+        self.emit = emit
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.started = time.time()
+        self._free = []
+        self._next = 0
+        self._slots = {}
+        self._dirty = set()
+        self._local = threading.local()
+        self._sampler = None
+
+    # --- SLOTS ---
+    def slot(self):
+        """This thread's slot key."""
+        h = getattr(self._local, 'handle', None)
+        if h is None:
+            with self.lock:
+                if self._free: n = min(self._free); self._free.remove(n)
+                else: n = self._next; self._next += 1
+            h = self._local.handle = _SlotHandle(self, n)
+        return f"{os.getpid()}-{h.n}"
+
+    def _release(self, n):
+        with self.lock:
+            self._free.append(n)
+            self._slots.pop(f"{os.getpid()}-{n}", None)
+
+    def set_slot(self, text, percent=None):
+        key = self.slot()
+        with self.lock:
+            self._slots[key] = (text, percent); self._dirty.add(key)
+        if self._sampler is None: self._start()
+
+    # --- COUNTERS ---
+    def inc(self, **deltas):
+        with self.lock:
+            for k, v in deltas.items(): self.counters[k] = self.counters.get(k, 0) + v
+
+    def reset(self):
+        with self.lock:
+            self.counters = dict.fromkeys(COUNTERS, 0)
+            self.started = time.time()
+
+    # --- SAMPLING ---
+    def snapshot(self):
+        """Counters and the slots changed since the last snapshot."""
+        now = time.time()
+        with self.lock:
+            slots = {k: self._slots[k] for k in self._dirty if k in self._slots}
+            self._dirty.clear()
+            return {'counters': dict(self.counters), 'slots': slots, 'elapsed': now - self.started}
+
+    def _start(self):
+        with self.lock:
+            if self._sampler is not None: return
+            self._sampler = threading.Thread(target=self._run, name="metrics", daemon=True)
+        self._sampler.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            for key, (text, percent) in self.snapshot()['slots'].items():
+                self.emit(AppEvent(EventType.SLOT_UPDATE, {"tid": key, "text": text, "percent": percent}))
+
+    def summary(self):
+        """Totals and average throughput since the last reset()."""
+        with self.lock: c = dict(self.counters); elapsed = max(0.001, time.time() - self.started)
+        parts = [f"{c['files']} files"]
+        if c['pages']: parts.append(f"{c['pages']} pages")
+        mb = max(c['bytes_in'], c['bytes_out']) / MB
+        if mb: parts.append(f"{mb:.0f} MB")
+        rates = [f"{c['files'] / elapsed:.1f} files/s"]
+        if c['pages']: rates.append(f"{c['pages'] / elapsed * 60:.0f} pages/min")
+        if mb: rates.append(f"{mb / elapsed:.1f} MB/s")
+        return f"{', '.join(parts)} in {elapsed:.1f}s ({', '.join(rates)})"
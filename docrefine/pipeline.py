@@ -0,0 +1,68 @@
+# SAVE AS: docrefine/pipeline.py
+import time
+import threading
+import concurrent.futures
+
+PREFETCH_CHUNK = 1024 * 1024
+
+class StageStats:
+    """Queue depth / activity / busy-time counters for one pipeline stage."""
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = max(1, workers)
+        self.lock = threading.Lock()
+        self.queued = 0; self.active = 0; self.done = 0; self.busy = 0.0
+        self.started = time.time()
+
+    def add_busy(self, seconds, count=1):
+        """For work that runs outside this object (e.g. the refine pool), fold in measured time."""
+        with self.lock: self.busy += seconds; self.done += count
+
+    def snapshot(self, queued=None, active=None, workers=None):
+        wall = max(0.001, time.time() - self.started)
+        workers = workers or self.workers
+        with self.lock:
+            return {"stage": self.name, "workers": workers,
+                    "queued": self.queued if queued is None else queued,
+                    "active": self.active if active is None else active,
+                    "done": self.done, "utilization": min(1.0, self.busy / (wall * workers))}
+
+class Stage(StageStats):
+    """
+    A pipeline stage with its own sized thread pool behind a bounded queue.
+    submit() blocks once `workers + depth` items are waiting or running, which is
+    what gives the upstream stage backpressure.
+    """
+    def __init__(self, name, workers, depth=None):
+        super().__init__(name, workers)
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"stage-{name}")
+        self.slots = threading.BoundedSemaphore(self.workers + (self.workers * 2 if depth is None else depth))
+
+    def submit(self, fn, *args, block=True):
+        """Returns a future, or None if the stage is full and block is False."""
+        if not self.slots.acquire(blocking=block): return None
+        with self.lock: self.queued += 1
+        def run():
+            with self.lock: self.queued -= 1; self.active += 1
+            t0 = time.time()
+            try: return fn(*args)
+            finally:
+                with self.lock: self.active -= 1; self.done += 1; self.busy += time.time() - t0
+                self.slots.release()
+        try: return self.executor.submit(run)
+        except RuntimeError:
+            # Pool already shut down (Stop): give the slot back
+            with self.lock: self.queued -= 1
+            self.slots.release(); return None
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait, cancel_futures=not wait)
+
+def prefetch_file(path):
+    """Read stage: pulls a master through once so the refine stage finds it in the OS page cache."""
+    buf = bytearray(PREFETCH_CHUNK)
+    with open(path, 'rb', buffering=0) as f:
+        while f.readinto(buf): pass
+
+def format_stages(snapshots):
+    return " | ".join(f"{s['stage']} q={s['queued']} run={s['active']}/{s['workers']} util={s['utilization']*100:.0f}%" for s in snapshots)
@@ -0,0 +1,153 @@
+# SAVE AS: docrefine/planning.py
+import re
+import json
+import time
+import hashlib
+import concurrent.futures
+from datetime import timedelta
+from PIL import Image
+
+from .config import CFG
+from .scheduler import TaskDispatcher
+from .processing import PdfProcessor, POPPLER_BIN, HAS_TESSERACT, pdfinfo_from_path, parse_lang_code
+
+# ==============================================================================
+#   REFINE ACTIONS
+# ==============================================================================
+def refine_action(path, options):
+    """(action, target_folder) for one master. Action None means a plain copy into Standard.
+    Masters named in options['passthrough'] (routed by triage) are always plain copies."""
+    ext = path.suffix.lower()
+    if path.name in options.get('passthrough', ()): return None, "Standard"
+    if ext == '.pdf':
+        mode = options.get('pdf_mode', 'none')
+        if mode == 'flatten': return 'pdf.flatten', "Flattened"
+        if mode == 'ocr': return 'pdf.ocr', "OCR"
+    elif ext in {'.jpg', '.png'}:
+        acts = [a for a, k in (('resize', 'resize'), ('pdf', 'img2pdf')) if options.get(k)]
+        if acts: return 'img.' + '+'.join(acts), "Resized"
+    elif ext in {'.docx', '.xlsx'} and options.get('sanitize'):
+        return 'office.sanitize', "Sanitized"
+    return None, "Standard"
+
+def refine_outputs(path, options, base_dst):
+    """(action, target_dir, output paths) a refine run is expected to leave behind for one master."""
+    action, folder = refine_action(path, options)
+    d = base_dst / folder
+    if action == 'img.pdf': return action, d, [d / f"{path.stem}.pdf"]
+    if action == 'img.resize+pdf': return action, d, [d / path.name, d / f"{path.stem}.pdf"]
+    return action, d, [d / path.name]
+
+def options_hash(action, options):
+    """Hash of only the settings that change this action's output."""
+    relevant = {}
+    if action in {'pdf.flatten', 'pdf.ocr'}: relevant['dpi'] = int(options.get('dpi', 300))
+    if action == 'pdf.ocr': relevant.update(ocr_lang=parse_lang_code(CFG.get("ocr_lang")), tesseract=HAS_TESSERACT)
+    if action and action.startswith('img.') and 'resize' in action: relevant['resize_width'] = CFG.get('resize_width')
+    return hashlib.md5(json.dumps([action, relevant], sort_keys=True).encode()).hexdigest()
+
+# ==============================================================================
+#   COST MODEL
+# ==============================================================================
+# One cost unit ~ one output pixel rendered. Plain byte copies are far cheaper
+# than rendering, so they are scaled down to stay comparable.
+BYTES_PER_UNIT = 16
+OCR_COST_FACTOR = 4.0
+# Peak-RAM multipliers on decoded RGB bytes (render + convert copies, tesseract working set)
+FLATTEN_MEM_FACTOR = 2.0
+OCR_MEM_FACTOR = 6.0
+IMAGE_MEM_FACTOR = 2.5
+OFFICE_MEM_FACTOR = 3.0
+BASE_TASK_MB = 50
+DEFAULT_PAGE_PTS = (612.0, 792.0)  # US Letter
+PDFINFO_TIMEOUT = 15
+MB = 1024 * 1024
+
+def pdf_page_info(path, timeout=PDFINFO_TIMEOUT):
+    """Returns (pages, (width_pts, height_pts)) from pdfinfo."""
+    info = pdfinfo_from_path(str(path), poppler_path=POPPLER_BIN, timeout=timeout)
+    pages = int(info.get("Pages", 1) or 1)
+    m = re.match(r'\s*([\d.]+)\s*x\s*([\d.]+)', str(info.get("Page size", "")))
+    size = (float(m.group(1)), float(m.group(2))) if m else DEFAULT_PAGE_PTS
+    return pages, size
+
+def copy_cost(path):
+    return max(1, path.stat().st_size // BYTES_PER_UNIT)
+
+def estimate(path, options):
+    """Rough (work units, peak MB) for refining one master with the given batch options."""
+    try:
+        size = path.stat().st_size
+        action, _ = refine_action(path, options)
+        if action in {'pdf.flatten', 'pdf.ocr'}:
+            dpi = int(options.get('dpi', 300))
+            try:
+                pages, (w, h) = pdf_page_info(path)
+            except Exception:
+                # Unknown layout: assume ~100KB per Letter page
+                pages, (w, h) = max(1, size // 102400), DEFAULT_PAGE_PTS
+            page_px = (w / 72.0 * dpi) * (h / 72.0 * dpi)
+            cost = pages * page_px
+            if action == 'pdf.ocr':
+                cost *= OCR_COST_FACTOR
+                mem = page_px * 3 * (OCR_MEM_FACTOR + PdfProcessor.RENDER_AHEAD)
+            else:
+                # The flatten merge holds every page decoded at once
+                mem = page_px * 3 * max(FLATTEN_MEM_FACTOR, pages)
+            return int(cost), int(BASE_TASK_MB + mem / MB)
+        if action and action.startswith('img.'):
+            with Image.open(path) as img: px = img.width * img.height
+            return px, int(BASE_TASK_MB + px * 4 * IMAGE_MEM_FACTOR / MB)
+        if action == 'office.sanitize':
+            return copy_cost(path), int(BASE_TASK_MB + size * OFFICE_MEM_FACTOR / MB)
+        return copy_cost(path), BASE_TASK_MB
+    except Exception:
+        return 1, BASE_TASK_MB
+
+# Watchdog: file_timeout_s covers BUDGET_REF_COST units (~10 Letter pages rendered at 300 DPI)
+# and grows linearly with the estimate, so a 2,000-page OCR job is not held to a small file's budget.
+BUDGET_REF_COST = 10 * 2550 * 3300
+
+def time_budget(cost):
+    """Seconds a task may run before the watchdog fails it, or None when disabled."""
+    base = int(CFG.get("file_timeout_s"))
+    if base <= 0: return None
+    return base * max(1.0, cost / BUDGET_REF_COST)
+
+def plan_batch(files, options, workers=8, progress=None, stop_check=None):
+    """Estimates every file in parallel and returns tasks ordered most-expensive first,
+    so long jobs start early instead of running alone at the tail of the batch.
+    Each task carries its watchdog budget, scaled from the same estimate."""
+    tasks = []
+    stop_check = stop_check or (lambda: False)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        dispatcher = TaskDispatcher(files, lambda f: executor.submit(estimate, f, options), workers, queue_depth=workers)
+        total = len(dispatcher.pending)
+        for i, (f, future) in enumerate(dispatcher.run(stop_check)):
+            cost, mem_mb = future.result()
+            tasks.append({'path': f, 'cost': cost, 'mem_mb': mem_mb, 'budget': time_budget(cost)})
+            if progress: progress(i + 1, total)
+        if stop_check(): return []
+    tasks.sort(key=lambda t: (-t['cost'], t['path'].name))
+    return tasks
+
+# ==============================================================================
+#   ETA
+# ==============================================================================
+class EtaTracker:
+    """Cost-weighted progress: percent and remaining time follow work done, not file count."""
+    def __init__(self, total_cost):
+        self.total = max(1, total_cost)
+        self.done = 0
+        self.start = time.time()
+
+    def add(self, cost): self.done += cost
+
+    @property
+    def percent(self): return min(100.0, self.done / self.total * 100)
+
+    def eta_text(self):
+        elapsed = time.time() - self.start
+        if self.done <= 0 or elapsed < 1: return "ETA --:--:--"
+        remaining = elapsed * (self.total - self.done) / self.done
+        return f"ETA {timedelta(seconds=int(max(0, remaining)))}"
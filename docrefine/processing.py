@@ -5,6 +5,8 @@ import os
 import zipfile
 import re
 import time
+import queue
+import threading
 from pathlib import Path
 from PIL import Image, ImageFile
 
@@ -21,6 +23,7 @@ except ImportError:
     pass
 
 from .config import CFG, SystemUtils, log_app
+from .scratch import get_scratch
 
 # ==============================================================================
 #   BINARY DETECTION
@@ -44,54 +47,123 @@ def parse_lang_code(selection):
         return selection.split("(")[1].replace(")", "")
     return selection
 
+def is_timeout(e):
+    """pdf2image, pytesseract and the watchdog each report an expired budget differently."""
+    return isinstance(e, TimeoutError) or type(e).__name__ == "PDFPopplerTimeoutError" or str(e) == "Tesseract process timeout"
+
+# ==============================================================================
+#   WATCHDOG
+# ==============================================================================
+class Watchdog:
+    """Time budget for one file. Time spent paused does not count against it."""
+    def __init__(self, budget_s=None):
+        self.budget = budget_s
+        self.deadline = time.time() + budget_s if budget_s else None
+
+    def extend(self, seconds):
+        if self.deadline: self.deadline += seconds
+
+    def remaining(self, cap=None):
+        """Seconds left, capped at `cap` (None = unlimited). Raises TimeoutError once the budget is spent."""
+        if self.deadline is None: return cap
+        left = self.deadline - time.time()
+        if left <= 0: raise TimeoutError("Timeout")
+        return left if cap is None else min(cap, left)
+
 # ==============================================================================
 #   PROCESSORS
 # ==============================================================================
 class BaseProcessor:
     def __init__(self, p_func, s_check, p_event): 
         self.progress = p_func; self.stop_sig_func = s_check; self.pause_event = p_event 
+        self._local = threading.local()  # processors are shared by the pool's threads
+    def watch(self, budget_s):
+        """Starts the watchdog for the file this thread is about to process."""
+        self._local.dog = Watchdog(budget_s)
+    @property
+    def dog(self): return getattr(self._local, 'dog', None) or Watchdog()
     def check_state(self):
         if self.stop_sig_func(): raise Exception("Stopped")
         if not self.pause_event.is_set():
             self.progress(None, "Paused...", status_only=True)
+            paused = time.time()
             self.pause_event.wait() 
+            self.dog.extend(time.time() - paused)
             if self.stop_sig_func(): raise Exception("Stopped")
+        self.dog.remaining()
 
 class PdfProcessor(BaseProcessor):
+    # Pages rendered ahead of the OCR/encode stage (bounded: each one is a decoded bitmap in RAM)
+    RENDER_AHEAD = 2
+
+    @staticmethod
+    def _offer(q, item, abort):
+        while not abort.is_set():
+            try: q.put(item, timeout=0.2); return
+            except queue.Full: pass
+
+    @staticmethod
+    def page_timeout(dpi):
+        """Per-call budget for pdftoppm/tesseract, scaled with the pixel count (page_timeout_s is for 300 DPI)."""
+        base = int(CFG.get("page_timeout_s"))
+        return base * max(1.0, (dpi / 300.0) ** 2) if base > 0 else None
+
+    def _render_pages(self, src, pages, dpi, page_q, abort, dog):
+        """Render stage: pdftoppm runs here while the calling thread OCRs/encodes the previous page."""
+        try:
+            for i in range(1, pages + 1):
+                while not self.pause_event.is_set() and not abort.is_set(): self.pause_event.wait(0.2)
+                if abort.is_set() or self.stop_sig_func(): break
+                gc.collect()
+                # A stuck pdftoppm is killed once the page or file budget runs out
+                res = convert_from_path(str(src), dpi=dpi, first_page=i, last_page=i, poppler_path=POPPLER_BIN, timeout=dog.remaining(self.page_timeout(dpi)))
+                self._offer(page_q, (i, res[0] if res else None), abort)
+                del res
+        except Exception as e: self._offer(page_q, (None, e), abort)
+        finally: self._offer(page_q, None, abort)
+
     def flatten_or_ocr(self, src, dest, mode='flatten', dpi=300):
-        temp = dest.parent / f"temp_{src.stem}"; temp.mkdir(parents=True, exist_ok=True)
+        # Page images and OCR fragments live in local scratch, not next to dest on the workspace volume
+        temp = get_scratch().task(src.stem)
+        abort = threading.Event()
+        dog = self.dog
         try:
-            info = pdfinfo_from_path(str(src), poppler_path=POPPLER_BIN)
+            info = pdfinfo_from_path(str(src), poppler_path=POPPLER_BIN, timeout=dog.remaining(self.page_timeout(dpi)))
             pages = info.get("Pages", 1)
             imgs = []
             
             ocr_lang = parse_lang_code(CFG.get("ocr_lang"))
 
-            for i in range(1, pages + 1):
+            page_q = queue.Queue(maxsize=self.RENDER_AHEAD)
+            threading.Thread(target=self._render_pages, args=(src, pages, dpi, page_q, abort, dog), daemon=True).start()
+
+            while True:
                 self.check_state() 
+                try: item = page_q.get(timeout=0.5)
+                except queue.Empty: continue
+                if item is None: break
+                i, img = item
+                if isinstance(img, Exception): raise img
                 
                 # UPDATE: Report EVERY page. 
                 # The worker.py throttler will ensure the UI doesn't freeze.
                 self.progress((i/pages)*100, f"Page {i}/{pages}")
-                
-                gc.collect() 
-                res = convert_from_path(str(src), dpi=dpi, first_page=i, last_page=i, poppler_path=POPPLER_BIN)
-                if not res: continue
-                img = res[0]
+                if img is None: continue
                 if mode == 'ocr' and HAS_TESSERACT:
-                    t_page = temp / f"page_{i}.jpg"; img.save(t_page, "JPEG", dpi=(int(dpi), int(dpi)))
-                    f = temp / f"{i}.pdf"
-                    with open(f, "wb") as o: o.write(pytesseract.image_to_pdf_or_hocr(str(t_page), extension='pdf', lang=ocr_lang))
+                    t_page = temp.file(f"page_{i}.jpg"); img.save(t_page, "JPEG", dpi=(int(dpi), int(dpi))); temp.account(t_page)
+                    f = temp.file(f"{i}.pdf")
+                    with open(f, "wb") as o: o.write(pytesseract.image_to_pdf_or_hocr(str(t_page), extension='pdf', lang=ocr_lang, timeout=dog.remaining(self.page_timeout(dpi)) or 0))
+                    temp.account(f); temp.discard(t_page)
                     imgs.append(str(f))
                 else:
-                    f = temp / f"{i}.jpg"; img.convert('RGB').save(f, "JPEG", quality=85); imgs.append(str(f))
-                del res; del img
+                    f = temp.file(f"{i}.jpg"); img.convert('RGB').save(f, "JPEG", quality=85); temp.account(f); imgs.append(str(f))
+                del img
             
             self.check_state(); self.progress(100, "Merging...")
             
             if mode == 'ocr' and HAS_TESSERACT:
                 m = pypdf.PdfWriter(); 
-                for f in imgs: m.append(f)
+                for f in imgs: self.check_state(); m.append(f)
                 m.write(dest); m.close()
             else:
                 base = Image.open(imgs[0]).convert('RGB')
@@ -99,45 +171,48 @@ class PdfProcessor(BaseProcessor):
             return True
         except Exception as e: 
             if str(e) == "Stopped": raise
+            if is_timeout(e): raise TimeoutError("Timeout") from e
             return False
-        finally: shutil.rmtree(temp, ignore_errors=True); gc.collect()
+        finally: abort.set(); temp.close(); gc.collect()
 
 class ImageProcessor(BaseProcessor):
     def resize(self, src, dest, w):
         try:
             self.check_state(); self.progress(50, "Processing...")
             with Image.open(src) as img:
-                img.load(); r = min(w / img.width, 1.0)
+                img.load(); self.check_state(); r = min(w / img.width, 1.0)
                 img.resize((int(img.width * r), int(img.height * r)), Image.Resampling.LANCZOS).convert('RGB').save(dest, "JPEG", quality=85)
             return True
         except Exception as e:
-            if str(e) == "Stopped": raise
+            if str(e) == "Stopped" or is_timeout(e): raise
             return False
     def convert_to_pdf(self, src, dest):
         try:
             self.check_state(); self.progress(50, "Converting...")
-            with Image.open(src) as img: img.load(); img.convert('RGB').save(dest, "PDF")
+            with Image.open(src) as img: img.load(); self.check_state(); img.convert('RGB').save(dest, "PDF")
             return True
         except Exception as e:
-            if str(e) == "Stopped": raise
+            if str(e) == "Stopped" or is_timeout(e): raise
             return False
 
 class OfficeProcessor(BaseProcessor):
     def sanitize(self, src, dest):
+        temp = get_scratch().task(src.stem)
         try:
             self.check_state()
             if src.suffix.lower() not in {'.docx', '.xlsx'}: shutil.copy2(src, dest); return False
             if not zipfile.is_zipfile(src): raise Exception("Corrupt File")
             self.progress(50, "Sanitizing...")
-            t = dest.parent / f"temp_{src.stem}"; shutil.rmtree(t, ignore_errors=True)
-            with zipfile.ZipFile(src) as z: z.extractall(t)
+            with zipfile.ZipFile(src) as z:
+                t = temp.dir("x", sum(i.file_size for i in z.infolist())); z.extractall(t)
+            self.check_state()
             c = t / "docProps" / "core.xml"
             if c.exists(): c.write_text(re.sub(r'(<dc:creator>).*?(</dc:creator>)', r'\1\2', c.read_text(), flags=re.DOTALL))
             with zipfile.ZipFile(dest, 'w') as z:
                 for r, _, fs in os.walk(t):
                     for f in fs: z.write(Path(r)/f, (Path(r)/f).relative_to(t))
-            shutil.rmtree(t)
             return True
         except Exception as e:
-            if str(e) == "Stopped": raise
-            shutil.copy2(src, dest); return False
\ No newline at end of file
+            if str(e) == "Stopped" or is_timeout(e): raise
+            shutil.copy2(src, dest); return False
+        finally: temp.close()
\ No newline at end of file
@@ -0,0 +1,167 @@
+# SAVE AS: docrefine/scheduler.py
+import time
+import itertools
+import collections
+import concurrent.futures
+
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+MB = 1024 * 1024
+
+# ==============================================================================
+#   AUTOSCALER
+# ==============================================================================
+class Autoscaler:
+    """
+    Samples psutil while a batch runs and proposes an in-flight concurrency
+    between `lo` and `hi`. Memory pressure (low available RAM or active
+    swapping) shrinks the target and holds new submissions; idle CPU grows it.
+    """
+    def __init__(self, lo, hi, start, ram_floor_mb=1024, interval=2.0, swap_mb_per_s=8):
+        self.lo = max(1, lo); self.hi = max(self.lo, hi)
+        self.target = min(self.hi, max(self.lo, start))
+        self.ram_floor_mb = ram_floor_mb
+        self.interval = interval
+        self.swap_limit = swap_mb_per_s * MB * interval
+        self.hold = False
+        self._last = 0
+        self._last_swap = None
+        if HAS_PSUTIL: psutil.cpu_percent(None)  # prime the CPU counter
+
+    def _swap_io(self):
+        try:
+            sw = psutil.swap_memory()
+            return sw.sin + sw.sout
+        except Exception: return 0
+
+    def sample(self):
+        """Returns the current target, re-evaluating at most once per interval."""
+        now = time.time()
+        if not HAS_PSUTIL or now - self._last < self.interval: return self.target
+        self._last = now
+        try:
+            avail_mb = psutil.virtual_memory().available / MB
+            cpu = psutil.cpu_percent(None)
+        except Exception: return self.target
+        swap = self._swap_io()
+        swapping = self._last_swap is not None and (swap - self._last_swap) > self.swap_limit
+        self._last_swap = swap
+
+        self.hold = avail_mb < self.ram_floor_mb or swapping
+        if self.hold:
+            self.target = max(self.lo, self.target - max(1, self.target // 4))
+        elif avail_mb > self.ram_floor_mb * 2:
+            if cpu < 50: self.target = min(self.hi, self.target + max(1, self.target // 2))
+            elif cpu < 80: self.target = min(self.hi, self.target + 1)
+        return self.target
+
+# ==============================================================================
+#   MEMORY ADMISSION
+# ==============================================================================
+class MemoryBudget:
+    """Tracks estimated MB held by running tasks against a fixed budget."""
+    def __init__(self, limit_mb):
+        self.limit = max(1, int(limit_mb))
+        self.in_use = 0
+
+    @staticmethod
+    def auto(guard_mb):
+        """Available RAM right now minus the configured safety guard."""
+        if not HAS_PSUTIL: return None
+        try: return MemoryBudget(max(512, psutil.virtual_memory().available / MB - guard_mb))
+        except Exception: return None
+
+    def oversized(self, mem): return mem > self.limit
+    def fits(self, mem): return self.in_use + mem <= self.limit
+    def acquire(self, mem): self.in_use += mem
+    def release(self, mem): self.in_use = max(0, self.in_use - mem)
+
+# ==============================================================================
+#   DISPATCHER
+# ==============================================================================
+class TaskDispatcher:
+    """
+    Feeds tasks (already in priority order) to an executor without ever
+    submitting more than the current concurrency limit (plus a small queue_depth),
+    so huge workspaces never materialize one future per file. With a MemoryBudget,
+    a task only starts once its 'mem_mb' estimate fits; smaller tasks may
+    overtake one that does not fit yet, and an oversized task waits for the
+    pool to drain and then runs alone. Yields (task, future) pairs as they finish.
+    """
+    LOOKAHEAD = 64
+
+    def __init__(self, tasks, submit, workers, autoscaler=None, on_resize=None, budget=None, queue_depth=0, prefetch=None, prefetch_depth=0):
+        self.pending = collections.deque(tasks)
+        self.queue_depth = queue_depth
+        self.prefetch = prefetch
+        self.prefetch_depth = prefetch_depth
+        self.submit = submit
+        self.workers = workers
+        self.autoscaler = autoscaler
+        self.on_resize = on_resize
+        self.budget = budget
+        self.inflight = {}
+
+    def limit(self):
+        if not self.autoscaler: return self.workers
+        target = self.autoscaler.sample()
+        if target != self.workers:
+            self.workers = target
+            if self.on_resize: self.on_resize(target)
+        return target
+
+    def held(self):
+        # Under memory pressure only start work when nothing else is running
+        return bool(self.autoscaler and self.autoscaler.hold and self.inflight)
+
+    def warm_upcoming(self):
+        """Hands the next few pending tasks to the read stage; it returns False when full."""
+        if not self.prefetch: return
+        for t in itertools.islice(self.pending, self.prefetch_depth):
+            if t.get('prefetched'): continue
+            if not self.prefetch(t): break
+            t['prefetched'] = True
+
+    def cancel(self):
+        """Cancels everything still queued; running futures are left to their cancel token."""
+        for future in self.inflight: future.cancel()
+        self.pending.clear()
+
+    def next_task(self):
+        """Pops the first pending task allowed to start now, or None."""
+        if not self.budget: return self.pending.popleft()
+        for i, t in enumerate(self.pending):
+            if i >= self.LOOKAHEAD: break
+            mem = t.get('mem_mb', 0)
+            if self.budget.oversized(mem):
+                if self.inflight: return None  # drain, then run it alone
+                break
+            if self.budget.fits(mem): break
+        else: return None
+        if i >= self.LOOKAHEAD: return None
+        del self.pending[i]
+        self.budget.acquire(t.get('mem_mb', 0))
+        return t
+
+    def run(self, stop_check, pause_check=lambda: False):
+        while self.pending or self.inflight:
+            if stop_check(): return self.cancel()
+            limit = self.limit() + self.queue_depth
+            while self.pending and len(self.inflight) < limit and not pause_check() and not self.held():
+                # Anything running alone because it is oversized blocks further admission
+                if self.budget and self.budget.in_use > self.budget.limit: break
+                t = self.next_task()
+                if t is None: break
+                self.inflight[self.submit(t)] = t
+            self.warm_upcoming()
+            if not self.inflight:
+                time.sleep(0.1); continue
+            done, _ = concurrent.futures.wait(list(self.inflight), timeout=0.1, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                t = self.inflight.pop(future)
+                if self.budget: self.budget.release(t.get('mem_mb', 0))
+                yield t, future
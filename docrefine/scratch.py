@@ -0,0 +1,155 @@
+# SAVE AS: docrefine/scratch.py
+import os
+import re
+import sys
+import shutil
+import atexit
+import tempfile
+import threading
+from pathlib import Path
+
+from .config import CFG
+
+MB = 1024 * 1024
+ROOT_PREFIX = "docrefine-"
+# Leave this much free on the fast path no matter what the budget says (other processes share a tmpfs)
+FREE_GUARD_MB = 256
+
+def _pid_alive(pid):
+    if pid == os.getpid(): return True
+    try:
+        import psutil
+        return psutil.pid_exists(pid)
+    except ImportError: pass
+    # Signal 0 is only a probe on POSIX; on Windows os.kill terminates the process. Leave the root alone there.
+    if os.name != "posix": return True
+    try: os.kill(pid, 0); return True
+    except PermissionError: return True
+    except OSError: return False
+
+def default_fast_dir():
+    """tmpfs where there is one (Linux /dev/shm), else the system temp dir."""
+    shm = Path("/dev/shm")
+    if sys.platform.startswith("linux") and shm.is_dir() and os.access(shm, os.W_OK): return shm
+    return Path(tempfile.gettempdir())
+
+# ==============================================================================
+#   SCRATCH SPACE
+# ==============================================================================
+class ScratchSpace:
+    """
+    Local scratch for refine intermediates (rendered pages, OCR fragments, unzipped Office parts),
+    so they never touch the workspace volume. Tasks write to the fast path (scratch_dir, default
+    tmpfs) while this process's accounted bytes stay under scratch_budget_mb, then fall back to
+    scratch_fallback_dir (default: system temp on disk). Each process owns a docrefine-<pid>
+    root in both places; roots left behind by a crashed process are removed on startup.
+    """
+    def __init__(self, fast=None, fallback=None, budget_mb=None):
+        self.fast_base = Path(fast or CFG.get("scratch_dir") or default_fast_dir())
+        self.fallback_base = Path(fallback or CFG.get("scratch_fallback_dir") or tempfile.gettempdir())
+        self.budget = (budget_mb if budget_mb is not None else int(CFG.get("scratch_budget_mb"))) * MB
+        self.lock = threading.Lock()
+        self.in_use = 0
+        self.peak = 0
+        self.fallbacks = 0
+        name = f"{ROOT_PREFIX}{os.getpid()}"
+        self.fast = self.fast_base / name
+        self.fallback = self.fallback_base / name
+        for base in {self.fast_base, self.fallback_base}: self.sweep(base)
+        atexit.register(self.cleanup)
+
+    @staticmethod
+    def sweep(base):
+        """Removes scratch roots whose owning process is gone."""
+        try:
+            for d in base.iterdir():
+                m = re.fullmatch(ROOT_PREFIX + r"(\d+)", d.name)
+                if m and d.is_dir() and not _pid_alive(int(m.group(1))): shutil.rmtree(d, ignore_errors=True)
+        except OSError: pass
+
+    def fits(self, nbytes=0):
+        if self.in_use + nbytes > self.budget: return False
+        try: return shutil.disk_usage(self.fast_base).free - nbytes > FREE_GUARD_MB * MB
+        except OSError: return False
+
+    def add(self, nbytes):
+        with self.lock:
+            self.in_use = max(0, self.in_use + nbytes)
+            self.peak = max(self.peak, self.in_use)
+
+    def root_for(self, nbytes=0):
+        if self.fits(nbytes): return self.fast
+        with self.lock: self.fallbacks += 1
+        return self.fallback
+
+    def task(self, name):
+        return ScratchTask(self, name)
+
+    def cleanup(self):
+        for root in {self.fast, self.fallback}: shutil.rmtree(root, ignore_errors=True)
+
+class ScratchTask:
+    """Intermediates for one file. Tracks its own bytes; close() removes everything and returns them."""
+    _seq = 0
+    _seq_lock = threading.Lock()
+
+    def __init__(self, space, name):
+        with ScratchTask._seq_lock:
+            ScratchTask._seq += 1; n = ScratchTask._seq
+        self.space = space
+        self.name = f"{n}_{re.sub(r'[^A-Za-z0-9._-]', '_', name)[:60]}"
+        self.sizes = {}
+        self.dirs = []
+
+    @property
+    def bytes(self): return sum(self.sizes.values())
+
+    def _dir(self, root):
+        d = root / self.name
+        if d not in self.dirs:
+            d.mkdir(parents=True, exist_ok=True); self.dirs.append(d)
+        return d
+
+    def file(self, name, expected=0):
+        """Path for a new intermediate file; on the fast path while the budget allows."""
+        return self._dir(self.space.root_for(expected)) / name
+
+    def dir(self, name, expected=0):
+        """Empty directory for bulk output (e.g. an extracted zip); `expected` bytes are reserved up front."""
+        d = self._dir(self.space.root_for(expected)) / name
+        d.mkdir(parents=True, exist_ok=True)
+        self.reserve(d, expected)
+        return d
+
+    def reserve(self, key, nbytes):
+        self.space.add(nbytes - self.sizes.get(key, 0)); self.sizes[key] = nbytes
+
+    def account(self, path):
+        """Records the size of a file just written."""
+        try: self.reserve(path, path.stat().st_size)
+        except OSError: pass
+
+    def discard(self, path):
+        try: path.unlink()
+        except OSError: pass
+        self.space.add(-self.sizes.pop(path, 0))
+
+    def close(self):
+        for d in self.dirs: shutil.rmtree(d, ignore_errors=True)
+        self.space.add(-self.bytes); self.sizes.clear(); self.dirs.clear()
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+
+_SPACE = None
+_SPACE_LOCK = threading.Lock()
+
+def get_scratch():
+    """The process-wide ScratchSpace (each pool child process builds its own); rebuilt when settings change."""
+    global _SPACE
+    key = (CFG.get("scratch_dir"), CFG.get("scratch_fallback_dir"), CFG.get("scratch_budget_mb"))
+    with _SPACE_LOCK:
+        if _SPACE is None or _SPACE.key != key:
+            if _SPACE is not None and _SPACE.in_use == 0: _SPACE.cleanup()
+            _SPACE = ScratchSpace(); _SPACE.key = key
+        return _SPACE
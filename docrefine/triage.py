@@ -0,0 +1,130 @@
+# SAVE AS: docrefine/triage.py
+import re
+import threading
+import concurrent.futures
+
+from .config import CFG
+from .processing import POPPLER_BIN, pdfinfo_from_path, is_timeout
+from .scheduler import TaskDispatcher
+
+try:
+    from pypdf import PdfReader
+    from pypdf.generic import ContentStream
+except ImportError:
+    PdfReader = None
+
+# ==============================================================================
+#   PDF TRIAGE
+# ==============================================================================
+OK = "OK"
+ENCRYPTED = "ENCRYPTED"
+DAMAGED = "DAMAGED"
+HUGE = "HUGE"
+IMAGE_ONLY = "IMAGE_ONLY"
+# Classes that cannot be rendered at all; refine skips them instead of failing into a copy
+UNRENDERABLE = {ENCRYPTED, DAMAGED}
+TRIAGE_DPI = 300
+
+# Operators a pure scan may use: graphics state, colour, clipping paths, marked content and image draws.
+# Anything else (text, fills, strokes, shadings) is drawn content a flatten pass has to render.
+_SCAN_OPS = {b'q', b'Q', b'cm', b'gs', b'w', b'J', b'j', b'M', b'd', b'ri', b'i',
+             b'm', b'l', b'c', b'v', b'y', b'h', b're', b'W', b'W*', b'n',
+             b'CS', b'cs', b'SC', b'SCN', b'sc', b'scn', b'G', b'g', b'RG', b'rg', b'K', b'k',
+             b'Do', b'INLINE IMAGE', b'BX', b'EX', b'MP', b'DP', b'BMC', b'BDC', b'EMC'}
+
+def _only_images(content, res, reader, depth=0):
+    """True if a content stream draws at least one image and nothing else (form XObjects are followed)."""
+    if content is None: return False
+    res = res.get_object() if res is not None else {}
+    xobjs = res.get('/XObject')
+    xobjs = xobjs.get_object() if xobjs is not None else {}
+    images = 0
+    for operands, op in ContentStream(content, reader).operations:
+        if op not in _SCAN_OPS: return False
+        if op == b'INLINE IMAGE': images += 1
+        elif op == b'Do':
+            xo = xobjs.get(operands[0]) if operands else None
+            if xo is None: return False
+            xo = xo.get_object()
+            if xo.get('/Subtype') == '/Image': images += 1
+            elif depth < 3 and _only_images(xo, xo.get('/Resources') or res, reader, depth + 1): images += 1
+            else: return False
+    return images > 0
+
+def _needs_render(reader):
+    """
+    False only for pure scans: every page draws images and nothing else, with no annotations and
+    no AcroForm. Text, vector art and blank pages all keep the document on the render path.
+    """
+    if '/AcroForm' in reader.trailer['/Root']: return True
+    for page in reader.pages:
+        if page.get('/Annots') or not _only_images(page.get_contents(), page.get('/Resources'), reader): return True
+    return False
+
+def _pypdf_probe(path, out):
+    """Password check, page count and the scan test; runs on a daemon thread so triage can give up on it."""
+    try:
+        r = PdfReader(str(path), strict=False)
+        if r.is_encrypted:
+            try: unlocked = r.decrypt("")
+            except Exception: unlocked = 0
+            if not unlocked: out['encrypted'] = True; return
+        out['pages'] = len(r.pages)
+        # HUGE is decided by page count alone; don't walk thousands of pages for it
+        out['render'] = out['pages'] > int(CFG.get("triage_huge_pages")) or _needs_render(r)
+    except Exception as e: out['error'] = str(e)[:120]
+
+def triage_pdf(path, timeout=None):
+    """
+    Classifies one PDF as OK, ENCRYPTED, DAMAGED, HUGE or IMAGE_ONLY without rendering it.
+    pdfinfo (killed after `timeout`) does the structural check; pypdf (abandoned after `timeout`)
+    handles passwords and the scan test.
+    Returns {'class', 'pages', 'reason'}.
+    """
+    timeout = timeout or int(CFG.get("triage_timeout_s"))
+    pages, size = 0, None
+    if POPPLER_BIN:
+        try:
+            info = pdfinfo_from_path(str(path), poppler_path=POPPLER_BIN, timeout=timeout)
+            pages = int(info.get("Pages", 0) or 0)
+            m = re.match(r'\s*([\d.]+)\s*x\s*([\d.]+)', str(info.get("Page size", "")))
+            if m: size = (float(m.group(1)), float(m.group(2)))
+        except Exception as e:
+            if is_timeout(e): return {'class': DAMAGED, 'pages': 0, 'reason': f"pdfinfo timed out after {timeout}s"}
+            msg = str(e)
+            if "password" in msg.lower(): return {'class': ENCRYPTED, 'pages': 0, 'reason': "Password required"}
+            return {'class': DAMAGED, 'pages': 0, 'reason': msg.strip().splitlines()[-1][:120] if msg.strip() else "pdfinfo failed"}
+
+    render = True
+    if PdfReader is not None:
+        # pypdf cannot be killed like pdfinfo; a parse still running after `timeout` counts as DAMAGED
+        out = {}
+        t = threading.Thread(target=_pypdf_probe, args=(path, out), name="triage-pypdf", daemon=True)
+        t.start(); t.join(timeout)
+        if t.is_alive(): return {'class': DAMAGED, 'pages': pages, 'reason': f"pypdf parse timed out after {timeout}s"}
+        if out.get('encrypted'): return {'class': ENCRYPTED, 'pages': pages, 'reason': "Password required"}
+        if 'error' in out:
+            if not POPPLER_BIN: return {'class': DAMAGED, 'pages': 0, 'reason': out['error']}
+        else:
+            pages = pages or out['pages']; render = out['render']
+
+    if pages == 0: return {'class': DAMAGED, 'pages': 0, 'reason': "PDF has 0 pages"}
+    if pages > int(CFG.get("triage_huge_pages")):
+        return {'class': HUGE, 'pages': pages, 'reason': f"{pages} pages"}
+    if size and (size[0] / 72 * TRIAGE_DPI) * (size[1] / 72 * TRIAGE_DPI) > int(CFG.get("max_pixels")):
+        return {'class': HUGE, 'pages': pages, 'reason': f"Page {size[0]:.0f}x{size[1]:.0f} pts exceeds pixel cap at {TRIAGE_DPI} DPI"}
+    if not render: return {'class': IMAGE_ONLY, 'pages': pages, 'reason': "Images only (scanned)"}
+    return {'class': OK, 'pages': pages, 'reason': ""}
+
+def triage_batch(paths, workers=8, stop_check=None, progress=None):
+    """Triage many PDFs in parallel. Returns {path: result}; partial if stop_check fires."""
+    results = {}
+    workers = max(1, workers)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        dispatcher = TaskDispatcher(paths, lambda p: executor.submit(triage_pdf, p), workers, queue_depth=workers)
+        total = len(dispatcher.pending)
+        for i, (p, future) in enumerate(dispatcher.run(stop_check or (lambda: False))):
+            try: results[p] = future.result()
+            except Exception as e: results[p] = {'class': DAMAGED, 'pages': 0, 'reason': str(e)[:120]}
+            if progress: progress(i + 1, total)
+    return results
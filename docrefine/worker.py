@@ -1,20 +1,22 @@
 # SAVE AS: docrefine/worker.py
 import threading
 import time
-import json
 import shutil
 import hashlib
 import uuid
 import os
 import csv
+import itertools
 import re
+import zipfile
 import concurrent.futures
+import multiprocessing
 import platform
 from pathlib import Path
 from datetime import datetime, timedelta
 
 # Local Package Imports
-from .config import CFG, SystemUtils, log_app, WORKSPACES_ROOT, LOG_PATH, JSON_LOG_PATH
+from .config import CFG, SystemUtils, log_app, WORKSPACES_ROOT, LOG_PATH, JSON_LOG_PATH, EVENT_LOG
 from .core.events import AppEvent, EventType
 from .processing import (
     PdfProcessor, 
@@ -25,6 +27,18 @@ from .processing import (
     pdfinfo_from_path,
     convert_from_path
 )
+from .planning import plan_batch, refine_action, refine_outputs, EtaTracker
+from .ledger import RefineLedger, build_records
+from .archive import ArchiveWriter, ARCHIVE_FORMATS
+from .wsmeta import META, atomic_write_json, read_json, update_json, workspace_lock
+from .manifest import ManifestStore, CompactManifest, PathPool
+from .metrics import MetricsRegistry
+from .pipeline import Stage, StageStats, prefetch_file, format_stages
+from .fileops import bulk_place, fast_copy, link_file, probe_link_method, is_removable, CopyEngine
+from .triage import triage_batch, UNRENDERABLE, HUGE, IMAGE_ONLY
+from .scratch import get_scratch
+from .indexes import SourceIndex, PrefixIndex, NameRegistry, QuarantineIndex
+from .scheduler import Autoscaler, TaskDispatcher, MemoryBudget
 
 try:
     import psutil
@@ -38,6 +52,11 @@ except ImportError:
     PdfReader = None
 
 SUPPORTED_EXTENSIONS = {'.pdf', '.doc', '.docx', '.jpg', '.png', '.xls', '.xlsx', '.csv', '.jpeg'}
+OOXML_EXTENSIONS = {'.docx', '.xlsx'}
+# Parts rewritten on every save (author, timestamps, app stats). Excluded from Smart fingerprints.
+OOXML_METADATA_PREFIXES = ('docProps/',)
+# ProcessPoolExecutor refuses more workers than WaitForMultipleObjects can watch on Windows
+WIN_MAX_PROCESS_WORKERS = 61
 
 # ==============================================================================
 #   HELPER FUNCTIONS
@@ -46,17 +65,23 @@ SUPPORTED_EXTENSIONS = {'.pdf', '.doc', '.docx', '.jpg', '.png', '.xls', '.xlsx'
 def sanitize_filename(name):
     return re.sub(r'[<>:"/\\|?*]', '_', name)
 
+def ooxml_fingerprint(path):
+    """Hash of the zip central directory (member names + CRC32s), minus metadata parts.
+    Only the directory at the end of the file is read; nothing is decompressed."""
+    with zipfile.ZipFile(path) as z:
+        members = sorted((i.filename, i.CRC, i.file_size) for i in z.infolist()
+                         if not i.filename.startswith(OOXML_METADATA_PREFIXES))
+    if not members: return None
+    h = hashlib.md5()
+    for name, crc, size in members: h.update(f"{name}\0{crc:08x}\0{size}\n".encode('utf-8'))
+    return h.hexdigest()
+
 def update_stats_time(ws, cat, sec):
-    try:
-        p = Path(ws) / "stats.json"
-        s = {}
-        if p.exists():
-            with open(p, 'r') as f: s = json.load(f)
-        s[cat] = s.get(cat, 0.0) + sec
-        with open(p, 'w') as f: json.dump(s, f, indent=4)
+    try: update_json(Path(ws) / "stats.json", lambda s: s.__setitem__(cat, s.get(cat, 0.0) + sec))
     except: pass
 
-def generate_job_report(ws_path, action_name, file_results=None):
+def generate_job_report(ws_path, action_name, file_results=None, details=None, total=None):
+    """total: files attempted, for jobs whose file_results only hold the failures."""
     try:
         ws = Path(ws_path)
         rpt_dir = ws / "04_Reports"
@@ -65,9 +90,7 @@ def generate_job_report(ws_path, action_name, file_results=None):
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M')
         file_name = f"Audit_Certificate_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
         
-        s = {}
-        if (ws / "stats.json").exists():
-            with open(ws / "stats.json") as f: s = json.load(f)
+        s = read_json(ws / "stats.json", {})
         
         total_orig = 0
         total_new = 0
@@ -94,11 +117,16 @@ def generate_job_report(ws_path, action_name, file_results=None):
             for e in errors:
                 fname = e.get('file', '?')
                 err_msg = e.get('error', 'Unknown')
-                rows.append(f"<tr class='error-row'><td>{fname}</td><td>FAILED</td><td>{err_msg}</td></tr>")
+                rows.append(f"<tr class='error-row'><td>{fname}</td><td>{e.get('status', 'FAILED')}</td><td>{err_msg}</td></tr>")
             error_rows = f"<table><thead><tr><th>File</th><th>Status</th><th>Error Details</th></tr></thead><tbody>{''.join(rows)}</tbody></table>"
         else:
             error_rows = "<p>No errors reported. Clean run.</p>"
 
+        perf_html = ""
+        if details:
+            rows = "".join(f"<tr><td>{k}</td><td>{v}</td></tr>" for k, v in details.items())
+            perf_html = f"<h3>Performance</h3><table><thead><tr><th>Metric</th><th>Value</th></tr></thead><tbody>{rows}</tbody></table>"
+
         # Calculate breakdown times
         t_ingest = str(timedelta(seconds=int(s.get('ingest_time', 0))))
         t_batch = str(timedelta(seconds=int(s.get('batch_time', 0))))
@@ -140,7 +168,7 @@ def generate_job_report(ws_path, action_name, file_results=None):
                 <div class="grid">
                     <div class="card">
                         <div class="card-label">Files Processed</div>
-                        <div class="card-value">{len(file_results) if file_results else s.get('total_scanned', 0)} <span style="font-size:12px;color:#999">(Skipped: {skipped})</span></div>
+                        <div class="card-value">{total if total is not None else len(file_results) if file_results else s.get('total_scanned', 0)} <span style="font-size:12px;color:#999">(Skipped: {skipped})</span></div>
                     </div>
                     <div class="card">
                         <div class="card-label">Storage Reclaimed</div>
@@ -159,6 +187,8 @@ def generate_job_report(ws_path, action_name, file_results=None):
                 <h3>Exceptions & Errors</h3>
                 {error_rows}
                 
+                {perf_html}
+                
                 <div class="footer">
                     This document certifies that the files listed above were processed by the DocRefine Engine.<br>
                     Generated automatically on {timestamp}
@@ -185,22 +215,30 @@ class Worker:
         self.pause_event = threading.Event()
         self.pause_event.set()
         self.current_ws = None 
-        self._last_update = {}
+        self.metrics = MetricsRegistry(self.emit)  # slots and counters for the UI and receipts
+        self._remote = None  # (stop_event, pause_event) mirrored into child processes
+        self._cancel = None  # per-batch token; never reset, so tasks orphaned by Stop keep seeing it
 
     def emit(self, event: AppEvent):
         """Bridge to the observer (UI/CLI)"""
+        # Status writes are coalesced; whoever reacts to DONE must see the final one
+        if event.type == EventType.DONE: META.flush()
         if self.callback:
             self.callback(event)
 
     def stop(self): 
         self.stop_sig = True
         self.pause_event.set()
+        if self._cancel: self._cancel.set()
+        if self._remote: self._remote[0].set(); self._remote[1].set()
 
     def pause(self): 
         self.pause_event.clear()
+        if self._remote: self._remote[1].clear()
 
     def resume(self): 
         self.pause_event.set()
+        if self._remote: self._remote[1].set()
 
     def log(self, m, err=False):
         level = "ERROR" if err else "INFO"
@@ -210,22 +248,15 @@ class Worker:
     def set_job_status(self, ws, stage, details=""):
         try:
             data = { "stage": stage, "last_update": datetime.now().strftime('%Y-%m-%d %H:%M:%S'), "details": details }
-            with open(Path(ws) / "status.json", 'w') as f: json.dump(data, f, indent=4)
+            META.write_json(Path(ws) / "status.json", data)
         except: pass
 
     def prog_main(self, v, t): 
         self.emit(AppEvent.progress(v, t))
     
     def prog_sub(self, v, t, status_only=False): 
-        tid = threading.get_ident()
-        now = time.time()
-        
-        if tid not in self._last_update:
-            self._last_update[tid] = 0
-            
-        if (now - self._last_update[tid]) > 0.1: 
-            self.emit(AppEvent(EventType.SLOT_UPDATE, {"tid": tid, "text": t, "percent": v}))
-            self._last_update[tid] = now
+        # Stored only; the metrics sampler turns changed slots into SLOT_UPDATE events
+        self.metrics.set_slot(t, v)
 
     def get_hash(self, path, mode):
         if os.path.getsize(path) == 0: return None, "Zero-Byte File"
@@ -241,6 +272,11 @@ class Worker:
                     txt = "".join([p.extract_text() for p in r.pages])
                     if len(txt.strip()) > 10: return hashlib.md5(f"{txt}{len(r.pages)}".encode()).hexdigest(), "Smart-Deep"
             except: pass 
+        elif path.suffix.lower() in OOXML_EXTENSIONS and mode != "Lightning":
+            try:
+                h = ooxml_fingerprint(path)
+                if h: return h, "Smart-OOXML"
+            except: pass
         try:
             h = hashlib.md5()
             with open(path, 'rb') as f:
@@ -248,36 +284,6 @@ class Worker:
             return h.hexdigest(), "Binary"
         except Exception as e: return None, f"Read-Error: {str(e)[:20]}"
 
-    def get_best_source(self, ws, file_uid, priority_mode="Auto (Best Available)"):
-        master = ws / "01_Master_Files" / file_uid
-        base_cache = ws / "02_Ready_For_Redistribution"
-        
-        def find_in_dir(d, stem):
-            if d.exists():
-                if (d / file_uid).exists(): return d / file_uid
-                match = next((f for f in d.iterdir() if f.stem == stem), None)
-                if match: return match
-            return None
-
-        stem = Path(file_uid).stem
-        
-        if "Force: OCR" in priority_mode:
-            f = find_in_dir(base_cache/"OCR", stem)
-            return f if f else master
-            
-        elif "Force: Flattened" in priority_mode:
-            f = find_in_dir(base_cache/"Flattened", stem)
-            return f if f else master
-            
-        elif "Force: Original" in priority_mode:
-            return master
-            
-        else: 
-            for sub in ["OCR", "Flattened", "Resized", "Sanitized", "Standard"]:
-                f = find_in_dir(base_cache/sub, stem)
-                if f: return f
-            return master if master.exists() else None
-
     def run_inventory(self, d_str, ingest_mode):
         try:
             self.stop_sig = False
@@ -294,15 +300,19 @@ class Worker:
             self.emit(AppEvent(EventType.JOB_DATA, str(ws)))
             self.set_job_status(ws, "SCANNING", "Ingesting...")
             
-            files = [Path(r)/f for r,_,fs in os.walk(d) for f in fs]
-            files = [f for f in files if f.suffix.lower() in SUPPORTED_EXTENSIONS]
-            
-            seen = {}; quarantined = 0
+            # Scan list and manifest share one interned path pool; nothing per file is a full path string
+            files = PathPool()
+            for r, _, fs in os.walk(d):
+                rel_dir = os.path.relpath(r, d)
+                for fn in fs:
+                    if os.path.splitext(fn)[1].lower() in SUPPORTED_EXTENSIONS: files.add(fn if rel_dir == '.' else os.path.join(rel_dir, fn))
+            seen = CompactManifest(d, files); quarantine = {}
             
             self.emit(AppEvent(EventType.WORKER_CONFIG, 1))
 
-            for i, f in enumerate(files):
+            for i in range(len(files)):
                 if self.stop_sig: break
+                rel = files.get(i); f = d / rel
                 if not self.pause_event.is_set(): 
                     self.prog_sub(None, "Paused...", True)
                     self.pause_event.wait()
@@ -315,12 +325,15 @@ class Worker:
                     h, method = self.get_hash(f, ingest_mode)
                     if not h: 
                         self.log(f"⚠️ Quarantine: {f.name}", True)
-                        shutil.copy2(f, ws/"00_Quarantine"/f"{uuid.uuid4()}_{sanitize_filename(f.name)}")
-                        quarantined += 1; continue
+                        q_key = str(uuid.uuid4()); q_file = f"{q_key}_{sanitize_filename(f.name)}"
+                        shutil.copy2(f, ws/"00_Quarantine"/q_file)
+                        # Exact mapping to the quarantined copy, so export never has to guess by name
+                        quarantine[q_key] = {'status': 'QUARANTINE', 'name': f.name, 'orig_name': f.name, 'q_file': q_file,
+                                             'master': rel, 'copies': [rel], 'root': str(d), 'error_reason': method,
+                                             'id': f"[Q{len(quarantine)+1:04d}]"}
+                        continue
                     
-                    rel = str(f.relative_to(d))
-                    if h in seen: seen[h]['copies'].append(rel)
-                    else: seen[h] = {'master': rel, 'copies': [rel], 'name': f.name, 'root': str(d)}
+                    seen.add(h, i, f.name, method)
                 except Exception as e:
                     self.log(f"Hash Error: {e}", True)
 
@@ -330,22 +343,27 @@ class Worker:
                 return
 
             self.log("Tagging..."); total = len(seen)
-            for i, (h, data) in enumerate(seen.items()):
+            for i in range(total):
                 if self.stop_sig: break
-                safe_name = f"[{i+1:04d}]_{sanitize_filename(data['name'])}"
-                shutil.copy2(d / data['master'], m_dir / safe_name)
-                data['uid'] = safe_name; data['id'] = f"[{i+1:04d}]"
+                safe_name = f"[{i+1:04d}]_{sanitize_filename(seen.names[i])}"
+                shutil.copy2(d / seen.paths.get(seen.first[i]), m_dir / safe_name)
+                seen.uids[i] = safe_name; seen.ids[i] = f"[{i+1:04d}]"
             
             if self.stop_sig: return
+            if CFG.get("triage_at_ingest"):
+                stubs = {i: {'uid': u} for i, u in enumerate(seen.uids) if u.lower().endswith('.pdf')}
+                self.triage_manifest(ws, stubs, lambda: self.stop_sig)
+                for i, st in stubs.items(): seen.triage[i] = st.get('triage')
 
             stats = {
                 "ingest_time": time.time()-start_time, 
                 "masters": total, 
-                "quarantined": quarantined,
+                "quarantined": len(quarantine),
                 "total_scanned": len(files)
             }
-            with open(ws/"manifest.json", 'w') as f: json.dump(seen, f, indent=4)
-            with open(ws/"stats.json", 'w') as f: json.dump(stats, f)
+            with ManifestStore(ws) as store:
+                store.write(itertools.chain(seen.items(), quarantine.items())); store.export_json()
+            with workspace_lock(ws): atomic_write_json(ws/"stats.json", stats, indent=None)
             self.set_job_status(ws, "INGESTED", f"Masters: {total}")
             self.log(f"Done. Masters: {total}")
             
@@ -356,8 +374,62 @@ class Worker:
             self.log(f"Error: {e}", True)
             self.emit(AppEvent(EventType.DONE))
 
-    def process_file_task(self, f, bots, options, base_dst):
-        if self.stop_sig: return None
+    def triage_manifest(self, ws, manifest, stop_check=None):
+        """Classifies every PDF master without a 'triage' entry (in place). Returns True if any were added."""
+        m_dir = ws / "01_Master_Files"
+        todo = {m_dir / d['uid']: d for d in manifest.values()
+                if d.get('uid', '').lower().endswith('.pdf') and 'triage' not in d and (m_dir / d['uid']).exists()}
+        if not todo: return False
+        self.prog_sub(None, f"Triage: {len(todo)} PDFs", True)
+        res = triage_batch(list(todo), workers=int(CFG.get("io_workers")) * 2, stop_check=stop_check,
+                           progress=lambda i, n: self.prog_main((i/n)*100, f"Triage {i}/{n}"))
+        counts = {}
+        for p, r in res.items():
+            todo[p]['triage'] = r
+            counts[r['class']] = counts.get(r['class'], 0) + 1
+        self.log("Triage: " + ", ".join(f"{n} {c}" for c, n in sorted(counts.items())))
+        return bool(res)
+
+    def load_triage(self, ws, stop_check=None):
+        """{master uid: triage} for a workspace, triaging (and saving) anything ingested before triage existed."""
+        if not ManifestStore.available(ws): return {}
+        with ManifestStore.open(ws) as store:
+            pending = {k: d for k, d in store.items() if 'triage' not in d and d.get('uid', '').lower().endswith('.pdf')}
+            if self.triage_manifest(ws, pending, stop_check):
+                store.update(pending.items()); store.export_json()
+            return {d['uid']: d['triage'] for d in store.values() if 'triage' in d and 'uid' in d}
+
+    def make_bots(self, cancel=None):
+        p = lambda v,t,s=False: self.prog_sub(v,t,s)
+        stop = cancel.is_set if cancel else (lambda: self.stop_sig)
+        return {
+            'pdf': PdfProcessor(p, stop, self.pause_event),
+            'img': ImageProcessor(p, stop, self.pause_event),
+            'office': OfficeProcessor(p, stop, self.pause_event)
+        }
+
+    def pick_backend(self, n_tasks, max_workers):
+        choice = str(CFG.get("exec_backend"))
+        if choice == "Processes": return "process"
+        if choice == "Threads" or max_workers < 2: return "thread"
+        # Auto: spawning interpreters only pays off once the batch is big enough
+        return "process" if n_tasks >= int(CFG.get("process_backend_min_files")) else "thread"
+
+    def _retire_pool(self, executor, event_q=None):
+        """Waits for tasks orphaned by Stop off the batch thread, then ends the event pump."""
+        executor.shutdown(wait=True)
+        if event_q is not None: event_q.put(None)
+
+    def _pump_events(self, event_q):
+        """Forwards events from child processes into the normal emit path."""
+        while True:
+            ev = event_q.get()
+            if ev is None: break
+            self.emit(ev)
+
+    def process_file_task(self, f, bots, options, base_dst, cancel=None, budget_s=None):
+        stopped = cancel.is_set if cancel else (lambda: self.stop_sig)
+        if stopped(): return None
         result = {'file': f.name, 'orig_size': f.stat().st_size, 'new_size': 0, 'ok': False, 'skipped': False}
         try:
             self.emit(AppEvent.status("PROCESSING", f"Refining: {f.name}", "blue"))
@@ -365,34 +437,28 @@ class Worker:
             ext = f.suffix.lower()
             ok = False
             dpi_val = int(options.get('dpi', 300))
+            start = time.time()
             
-            target_folder = "Standard"
-            
-            if ext == '.pdf':
-                mode = options.get('pdf_mode', 'none')
-                if mode == 'flatten': target_folder = "Flattened"
-                elif mode == 'ocr': target_folder = "OCR"
-            elif ext in {'.jpg','.png'}:
-                if options.get('resize'): target_folder = "Resized"
-                if options.get('img2pdf'): target_folder = "Resized" 
-            elif ext in {'.docx','.xlsx'}:
-                if options.get('sanitize'): target_folder = "Sanitized"
-            
-            final_dst_dir = base_dst / target_folder
+            # Up-to-date outputs were already filtered out against the refine ledger in run_batch,
+            # so anything still on disk here is stale (other options, truncated, edited) and is redone
+            action, final_dst_dir, outputs = refine_outputs(f, options, base_dst)
             final_dst_dir.mkdir(parents=True, exist_ok=True)
             dst_file = final_dst_dir / f.name
-
-            # FIX: Skip if already exists
-            if dst_file.exists() and dst_file.stat().st_size > 0:
-                result['new_size'] = dst_file.stat().st_size
-                result['ok'] = True
-                result['skipped'] = True
-                return result
+            for o in outputs: o.unlink(missing_ok=True)
+            # Watchdog: every processor checks this file's budget, and subprocess timeouts are capped by it
+            for b in bots.values(): b.watch(budget_s)
 
             if ext == '.pdf':
                 mode = options.get('pdf_mode', 'none')
-                if mode == 'flatten': ok = bots['pdf'].flatten_or_ocr(f, dst_file, 'flatten', dpi=dpi_val)
-                elif mode == 'ocr': ok = bots['pdf'].flatten_or_ocr(f, dst_file, 'ocr', dpi=dpi_val)
+                if mode in {'flatten', 'ocr'}:
+                    try: ok = bots['pdf'].flatten_or_ocr(f, dst_file, mode, dpi=dpi_val)
+                    except TimeoutError:
+                        retry_dpi = int(CFG.get("timeout_retry_dpi"))
+                        if not 0 < retry_dpi < dpi_val: raise
+                        self.log(f"Timeout {f.name} at {dpi_val} DPI, retrying at {retry_dpi} DPI")
+                        bots['pdf'].watch(budget_s)
+                        ok = bots['pdf'].flatten_or_ocr(f, dst_file, mode, dpi=retry_dpi)
+                        result['retried_dpi'] = retry_dpi
             elif ext in {'.jpg','.png'}:
                 if options.get('resize'): ok = bots['img'].resize(f, dst_file, CFG.get('resize_width'))
                 if options.get('img2pdf'): ok = bots['img'].convert_to_pdf(f, final_dst_dir/f"{f.stem}.pdf")
@@ -400,43 +466,122 @@ class Worker:
                 if options.get('sanitize'): ok = bots['office'].sanitize(f, dst_file)
 
             # FIX: Pause/Stop Safety Net - DO NOT COPY if stopped
-            if self.stop_sig or not self.pause_event.is_set():
+            if stopped() or not self.pause_event.is_set():
                 # If we stopped, we don't copy the original. We just fail the task safely.
                 return None
 
-            if not ok and not dst_file.exists(): 
+            if not ok and not dst_file.exists() and dst_file in outputs: 
                 shutil.copy2(f, dst_file)
             
-            if dst_file.exists():
-                result['new_size'] = dst_file.stat().st_size
+            if all(o.exists() for o in outputs):
+                result['new_size'] = sum(o.stat().st_size for o in outputs)
                 result['ok'] = True
+                # A fallback copy of the original or a lower-DPI retry is not a valid refined output; leave it to be retried.
+                # Hashing for the ledger happens in the parent's verify stage, off the CPU pool.
+                if (ok or action is None) and 'retried_dpi' not in result: result['verify'] = (action, outputs)
             
+            result['duration'] = time.time() - start
             return result
                  
+        except TimeoutError:
+            # Nothing is copied in place of a timed-out file; it stays failed until the next run
+            for o in refine_outputs(f, options, base_dst)[2]: o.unlink(missing_ok=True)
+            reason = f"Timeout after {budget_s:.0f}s budget" if budget_s else "Timeout (page budget exceeded)"
+            self.log(f"{reason}: {f.name}", True)
+            result.update(error=reason, timeout=True, status='TIMEOUT')
+            return result
         except Exception as e:
+            if str(e) == "Stopped": return None
             self.log(f"Err {f.name}: {e}", True)
             result['error'] = str(e)
             return result
 
+    def run_passthrough(self, files, options, base_dst, ledger, file_results, cancel):
+        """Links/clones every master that only needs copying in one bulk pass on the I/O pool."""
+        mode = CFG.get("passthrough_mode")
+        self.emit(AppEvent.status("PROCESSING", f"Passthrough: {len(files)} files", "blue"))
+        start = time.time()
+        pairs = [(f, refine_outputs(f, options, base_dst)[2][0]) for f in files]
+        placed = bulk_place(pairs, mode, workers=int(CFG.get("io_workers")), stop_check=cancel.is_set,
+                            progress=lambda i, n: self.prog_main((i/n)*100, f"Passthrough {i}/{n}"))
+        methods = {}
+        for f, out in pairs:
+            if f not in placed: continue
+            method, err = placed[f]
+            size = f.stat().st_size
+            if err:
+                self.log(f"Err {f.name}: {err}", True)
+                ledger.forget(f, options)
+                file_results.append({'file': f.name, 'orig_size': size, 'new_size': 0, 'ok': False, 'skipped': False, 'error': err})
+                continue
+            methods[method] = methods.get(method, 0) + 1
+            self.metrics.inc(files=1, bytes_in=size, bytes_out=size)
+            ledger.record(build_records(f, None, options, [out], base_dst, 0, digest=False))
+            file_results.append({'file': f.name, 'orig_size': size, 'new_size': size, 'ok': True, 'skipped': False})
+        summary = ", ".join(f"{n} {m}" for m, n in sorted(methods.items())) or "none"
+        self.log(f"Passthrough: {len(placed)}/{len(files)} files in {time.time() - start:.1f}s ({summary})")
+
     def run_batch(self, ws_p, options):
         try:
             self.stop_sig = False
+            cancel = self._cancel = threading.Event()
             self.resume()
             
             ws = Path(ws_p); self.current_ws = str(ws)
             start_time = time.time(); src = ws/"01_Master_Files"
             dst = ws/"02_Ready_For_Redistribution"; dst.mkdir(exist_ok=True)
             self.log(f"Refinement Start. Opts: {options}")
+            self.metrics.reset()
             self.set_job_status(ws, "PROCESSING", "Refining...")
 
-            bots = {
-                'pdf': PdfProcessor(lambda v,t,s=False: self.prog_sub(v,t,s), lambda: self.stop_sig, self.pause_event),
-                'img': ImageProcessor(lambda v,t,s=False: self.prog_sub(v,t,s), lambda: self.stop_sig, self.pause_event),
-                'office': OfficeProcessor(lambda v,t,s=False: self.prog_sub(v,t,s), lambda: self.stop_sig, self.pause_event)
-            }
-            fs = list(src.iterdir())
+            # PDF triage: unrenderable masters are skipped up front instead of failing into a copy after
+            # minutes of rendering; scans are already flat, so flattening routes them to passthrough
+            pdf_mode = options.get('pdf_mode', 'none')
+            triaged = self.load_triage(ws, cancel.is_set) if pdf_mode in {'flatten', 'ocr'} else {}
+            routed = dict(options, passthrough={u for u, t in triaged.items() if pdf_mode == 'flatten' and t['class'] == IMAGE_ONLY})
+            file_results = []
+
+            # Passthrough planner: masters no processor applies to are placed in bulk below and never take a worker slot
+            fs = []; passthrough = []
+            for f in src.iterdir():
+                t = triaged.get(f.name)
+                if t and (t['class'] in UNRENDERABLE or (t['class'] == HUGE and CFG.get("triage_skip_huge"))):
+                    self.log(f"Triage Skip {f.name}: {t['class']} ({t['reason']})", True)
+                    file_results.append({'file': f.name, 'orig_size': f.stat().st_size, 'new_size': 0, 'ok': False, 'skipped': False, 'error': t['reason'], 'triage': t['class'], 'status': t['class']})
+                    continue
+                (fs if refine_action(f, routed)[0] else passthrough).append(f)
+            # Option-aware resume: only masters whose outputs are missing, changed or stale get refined.
+            # Filtered before estimation, so a re-run never pays pdfinfo/image probes for finished masters.
+            ledger = RefineLedger(ws)
+            todo = []
+            for f in fs:
+                if ledger.is_current(f, options):
+                    file_results.append({'file': f.name, 'orig_size': f.stat().st_size, 'new_size': ledger.output_size(f, options), 'ok': True, 'skipped': True})
+                else: todo.append(f)
+            pending_copy = []
+            for f in passthrough:
+                if ledger.is_current(f, routed):
+                    file_results.append({'file': f.name, 'orig_size': f.stat().st_size, 'new_size': f.stat().st_size, 'ok': True, 'skipped': True})
+                else: pending_copy.append(f)
+            current = sum(1 for r in file_results if r['skipped'])
+            if current: self.log(f"Ledger: {current} up-to-date, {len(todo) + len(pending_copy)} to refine")
+            tasks = plan_batch(todo, options, progress=lambda i, n: self.prog_main((i/n)*100, f"Estimating {i}/{n}"), stop_check=cancel.is_set)
+            if cancel.is_set():
+                self.log("Batch Stopped by User.")
+                self.emit(AppEvent(EventType.DONE))
+                return
+
+            if pending_copy:
+                self.run_passthrough(pending_copy, routed, dst, ledger, file_results, cancel)
+                if cancel.is_set():
+                    ledger.save()
+                    self.log("Batch Stopped by User.")
+                    self.emit(AppEvent(EventType.DONE))
+                    return
+            eta = EtaTracker(sum(t['cost'] for t in tasks))
             
             forced_workers = int(CFG.get("max_threads"))
+            autoscaler = None
             if forced_workers > 0:
                 max_workers = forced_workers
                 self.log(f"Manual Worker Override: {max_workers}")
@@ -452,23 +597,107 @@ class Worker:
                 
                 max_workers = min(max_workers, os.cpu_count() or 1)
                 max_workers = max(1, max_workers)
-                self.log(f"Auto-Throttled Workers: {max_workers}")
+                if HAS_PSUTIL and CFG.get("autoscale_workers"):
+                    # RAM band is only the starting point; live sampling moves it within bounds
+                    hi = int(CFG.get("autoscale_max_workers")) or os.cpu_count() or 1
+                    autoscaler = Autoscaler(int(CFG.get("autoscale_min_workers")), hi, max_workers, ram_floor_mb=int(CFG.get("ram_warning_mb")))
+                    max_workers = autoscaler.target
+                    self.log(f"Autoscaling Workers: {autoscaler.lo}-{autoscaler.hi} (start {max_workers})")
+                else:
+                    self.log(f"Auto-Throttled Workers: {max_workers}")
 
+            pool_size = autoscaler.hi if autoscaler else max_workers
+            backend = self.pick_backend(len(tasks), pool_size)
+            self.log(f"Execution Backend: {backend}")
+            if backend == "process" and os.name == "nt" and pool_size > WIN_MAX_PROCESS_WORKERS:
+                pool_size = WIN_MAX_PROCESS_WORKERS; max_workers = min(max_workers, pool_size)
+                if autoscaler: autoscaler.hi = pool_size; autoscaler.target = min(autoscaler.target, pool_size)
+                self.log(f"Process Pool Capped: {pool_size} workers (Windows limit)")
             self.emit(AppEvent(EventType.WORKER_CONFIG, max_workers))
-            
-            file_results = []
-            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-                futures = {executor.submit(self.process_file_task, f, bots, options, dst): f for f in fs}
-                for i, future in enumerate(concurrent.futures.as_completed(futures)):
-                    if self.stop_sig: break
-                    # FIX: 100% Math
-                    self.prog_main(((i+1)/len(fs))*100, f"Refining {i+1}/{len(fs)}")
+            pump = None
+            if backend == "process":
+                ctx = multiprocessing.get_context("spawn")
+                event_q = ctx.Queue(); stop_ev = ctx.Event(); pause_ev = ctx.Event(); pause_ev.set()
+                self._remote = (stop_ev, pause_ev)
+                pump = threading.Thread(target=self._pump_events, args=(event_q,), daemon=True); pump.start()
+                executor = concurrent.futures.ProcessPoolExecutor(max_workers=pool_size, mp_context=ctx, initializer=_child_init, initargs=(event_q, stop_ev, pause_ev))
+                submit = lambda t: executor.submit(_child_process_file, t['path'], options, dst, self.current_ws, t.get('budget'))
+            else:
+                bots = self.make_bots(cancel)
+                executor = concurrent.futures.ThreadPoolExecutor(max_workers=pool_size)
+                submit = lambda t: executor.submit(self.process_file_task, t['path'], bots, options, dst, cancel, t.get('budget'))
+
+            def on_resize(n):
+                self.log(f"Autoscaler: {n} workers")
+                self.emit(AppEvent(EventType.WORKER_CONFIG, n))
+
+            # Admission control: ram_warning_mb stays free on top of whatever the tasks are expected to use
+            budget_mb = int(CFG.get("memory_budget_mb"))
+            budget = MemoryBudget(budget_mb) if budget_mb > 0 else MemoryBudget.auto(int(CFG.get("ram_warning_mb")))
+            if budget:
+                big = sum(1 for t in tasks if budget.oversized(t['mem_mb']))
+                self.log(f"Memory Budget: {budget.limit} MB" + (f" ({big} oversized task(s) will run alone)" if big else ""))
+
+            # A fixed pool gets a small queue so a slot never idles between completion and the next submit.
+            # An autoscaled pool is larger than its limit, so anything extra would run rather than queue.
+            depth = 0 if autoscaler else max(1, max_workers // 4)
+
+            # Staged pipeline: read (I/O pool) -> refine (CPU pool; render and OCR/encode overlap per page
+            # inside PdfProcessor) -> verify (I/O pool). Bounded stages give each other backpressure.
+            io_workers = max(1, int(CFG.get("io_workers")))
+            read_stage = Stage("read", io_workers, depth=io_workers)
+            verify_stage = Stage("verify", io_workers)
+            refine_stats = StageStats("refine", max_workers)
+            prefetch = lambda t: read_stage.submit(prefetch_file, t['path'], block=False) is not None
+            dispatcher = TaskDispatcher(tasks, submit, max_workers, autoscaler, on_resize, budget, queue_depth=depth, prefetch=prefetch, prefetch_depth=io_workers * 2)
+            stage_snapshots = lambda: [read_stage.snapshot(), refine_stats.snapshot(queued=len(dispatcher.pending), active=len(dispatcher.inflight), workers=dispatcher.workers), verify_stage.snapshot()]
+
+            verifying = {}
+            def collect_verified(block=False):
+                if block: concurrent.futures.wait(list(verifying))
+                for vf in [v for v in verifying if v.done()]:
+                    f = verifying.pop(vf)
+                    try: ledger.record(vf.result())
+                    except Exception as e: self.log(f"Verify Err {f.name}: {e}", True)
+
+            last_stage_log = time.time()
+            try:
+                # Tasks are already longest-first; the dispatcher keeps that order and the live limit
+                for i, (task, future) in enumerate(dispatcher.run(cancel.is_set, lambda: not self.pause_event.is_set())):
+                    eta.add(task['cost'])
+                    self.prog_main(eta.percent, f"Refining {i+1}/{len(tasks)} · {eta.eta_text()}")
                     try: 
                         r = future.result()
-                        if r: file_results.append(r)
+                        if r:
+                            refine_stats.add_busy(r.get('duration', 0))
+                            self.metrics.inc(files=1, pages=(triaged.get(task['path'].name) or {}).get('pages', 0) if r.get('ok') else 0,
+                                             bytes_in=r.get('orig_size', 0), bytes_out=r.get('new_size', 0))
+                            v = r.pop('verify', None)
+                            if v:
+                                vf = verify_stage.submit(build_records, task['path'], v[0], options, v[1], dst, r['duration'])
+                                if vf: verifying[vf] = task['path']
+                            elif not r.get('ok'): ledger.forget(task['path'], options)
+                            file_results.append(r)
                     except Exception as e: self.log(f"Thread Err: {e}", True)
+                    collect_verified()
+                    if time.time() - last_stage_log > 30:
+                        self.log(f"Pipeline: {format_stages(stage_snapshots())}"); last_stage_log = time.time()
+                        self.log(f"Throughput: {self.metrics.summary()}")
+                if not cancel.is_set(): collect_verified(block=True)
+            finally:
+                read_stage.shutdown(wait=False)
+                verify_stage.shutdown(wait=not cancel.is_set())
+                ledger.save()
+                self._remote = None
+                if cancel.is_set():
+                    # Stop: drop queued work now; running tasks bail out at their next token check
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    threading.Thread(target=self._retire_pool, args=(executor, event_q if pump else None), daemon=True).start()
+                else:
+                    self._retire_pool(executor, event_q if pump else None)
+                    if pump: pump.join()
 
-            if self.stop_sig: 
+            if cancel.is_set(): 
                 self.log("Batch Stopped by User.")
                 self.emit(AppEvent(EventType.DONE))
                 return
@@ -476,7 +705,14 @@ class Worker:
             update_stats_time(ws, "batch_time", time.time() - start_time)
             self.set_job_status(ws, "PROCESSED", "Complete")
             
-            rpt = generate_job_report(ws, "Content Refinement Batch", file_results)
+            stages = stage_snapshots()
+            self.log(f"Pipeline: {format_stages(stages)}")
+            details = {"Throughput": self.metrics.summary()}
+            details.update({f"Stage: {st['stage']}": f"{st['utilization']*100:.0f}% busy ({st['workers']} workers, {st['done']} items)" for st in stages})
+            if backend == "thread":
+                sp = get_scratch()
+                details["Scratch"] = f"{sp.fast_base} (peak {sp.peak / (1024 * 1024):.0f} MB, {sp.fallbacks} disk fallbacks)"
+            rpt = generate_job_report(ws, "Content Refinement Batch", file_results, details)
             if rpt: self.log(f"Receipt Generated: {Path(rpt).name}")
             
             self.emit(AppEvent(EventType.JOB_DATA, str(ws))) 
@@ -488,6 +724,41 @@ class Worker:
             self.log(f"Err: {e}", True)
             self.emit(AppEvent(EventType.DONE))
 
+    def copy_engine(self, copy_fn=fast_copy):
+        """Parallel copier wired to this worker's Stop/Pause and Active Workers slots."""
+        workers = max(1, int(CFG.get("copy_workers")))
+        self.emit(AppEvent(EventType.WORKER_CONFIG, workers))
+        return CopyEngine(workers, copy_fn, on_slot=self.metrics.set_slot, stop_check=lambda: self.stop_sig, pause_event=self.pause_event, metrics=self.metrics)
+
+    def run_copies(self, engine, jobs, file_results, label):
+        """Runs the planned (src, dst) jobs; failures go to the receipt, throughput to the log."""
+        failed = engine.run(jobs, progress=lambda i, n: self.prog_main((i/n)*100, f"{label} {i}/{n}"))
+        for src, tgt, err in failed:
+            self.log(f"Copy Err {tgt.name}: {err}", True)
+            file_results.append({'file': tgt.name, 'orig_size': 0, 'new_size': 0, 'ok': False, 'skipped': False, 'error': err})
+        self.log(f"{label}: {engine.summary()}")
+
+    def run_archive(self, writer, entries, total, file_results):
+        """Streams (src, arcname) entries into the archive writer in one sequential pass."""
+        self.emit(AppEvent(EventType.WORKER_CONFIG, 1))
+        last = 0
+        try:
+            for i, (src, name) in enumerate(entries):
+                self.pause_event.wait()
+                if self.stop_sig: break
+                now = time.time()
+                if now - last > CopyEngine.SLOT_INTERVAL:
+                    last = now
+                    self.prog_main(((i+1)/total)*100, f"Archiving {i+1}/{total}")
+                    self.metrics.set_slot(f"Archiving: {Path(name).name}")
+                try:
+                    if writer.add(src, name): self.metrics.inc(files=1, bytes_in=os.path.getsize(src))
+                except Exception as e:
+                    self.log(f"Archive Err {Path(name).name}: {e}", True)
+                    file_results.append({'file': Path(name).name, 'orig_size': 0, 'new_size': 0, 'ok': False, 'skipped': False, 'error': str(e)})
+        finally: writer.close()
+        self.log(f"Archive: {writer.summary()}")
+
     def run_organize(self, ws_p, priority_mode):
         try:
             self.stop_sig = False; self.resume()
@@ -498,49 +769,70 @@ class Worker:
             for p in [m,q]: p.mkdir(parents=True, exist_ok=True)
             
             self.log(f"Unique Export ({priority_mode})")
-            with open(ws/"manifest.json") as f: man = json.load(f)
-            total = len(man)
-            
-            self.emit(AppEvent(EventType.WORKER_CONFIG, 1))
+            self.metrics.reset()
+            with ManifestStore.open(ws) as man:
+                total = len(man)
+                sources = SourceIndex(ws)
+                q_index = QuarantineIndex(ws/"00_Quarantine"); q_done = set()
 
-            dup_csv = out / "duplicates_report.csv"
-            with open(dup_csv, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.writer(csvfile)
-                writer.writerow(["Master_Filename", "Duplicate_Location"])
+                # Names from the last export stay with their masters; the rest are assigned in memory
+                names_csv = out / "export_names.csv"
+                previous = {}
+                if names_csv.exists():
+                    try:
+                        with open(names_csv, newline='', encoding='utf-8-sig') as f: previous = {r['Master_UID']: r['Exported_Name'] for r in csv.DictReader(f)}
+                    except Exception as e: self.log(f"Name Map Read Error: {e}", True)
+                names = NameRegistry(m, previous)
+                name_rows = []
+
+                # Plan every copy first (names, CSV), then hand the whole list to the parallel copy engine
+                jobs = []
+                dup_csv = out / "duplicates_report.csv"
+                with open(dup_csv, 'w', newline='', encoding='utf-8') as csvfile:
+                    writer = csv.writer(csvfile)
+                    writer.writerow(["Master_Filename", "Duplicate_Location"])
                 
-                for i, (h, data) in enumerate(man.items()):
-                    if self.stop_sig: break
-                    self.prog_main(((i+1)/total)*100, "Exporting Unique...")
-                    self.emit(AppEvent(EventType.SLOT_UPDATE, {"tid": threading.get_ident(), "text": f"Exporting: {data['name']}", "percent": None}))
+                    for i, (h, data) in enumerate(man.items()):
+                        if self.stop_sig: break
+                        if i % 500 == 0: self.prog_main(((i+1)/total)*100, "Planning Export...")
                     
-                    if data.get("status") == "QUARANTINE": 
-                        for f in (ws/"00_Quarantine").glob("*"):
-                            if data['orig_name'] in f.name: shutil.copy2(f, q/f.name)
-                    else:
-                        src = self.get_best_source(ws, data['uid'], priority_mode)
-                        if src and src.exists():
-                            clean_name = data['name']
-                            if src.suffix != Path(clean_name).suffix:
-                                clean_name = Path(clean_name).stem + src.suffix
-
-                            tgt = m / clean_name
-                            ctr = 1
-                            while tgt.exists():
-                                tgt = m / f"{Path(clean_name).stem}_{ctr}{Path(clean_name).suffix}"
-                                ctr += 1
-                            shutil.copy2(src, tgt)
-
-                        if len(data.get('copies', [])) > 1:
-                            for c in data['copies']:
-                                if c != data.get('master'):
-                                    writer.writerow([data['name'], c])
+                        if data.get("status") == "QUARANTINE": 
+                            q_files = q_index.files_for(data, sanitize_filename(data.get('orig_name', '')))
+                            if not q_files: self.log(f"Quarantine file missing: {data.get('orig_name')}", True)
+                            # Legacy entries sharing a name match the same files; copy each file once
+                            jobs += [(f, q/f.name) for f in q_files if f not in q_done]; q_done.update(q_files)
+                        else:
+                            src = sources.best(data['uid'], priority_mode)
+                            if src and src.exists():
+                                clean_name = data['name']
+                                if src.suffix != Path(clean_name).suffix:
+                                    clean_name = Path(clean_name).stem + src.suffix
+
+                                tgt = m / names.assign(data['uid'], clean_name)
+                                jobs.append((src, tgt))
+                                name_rows.append([data.get('id', ''), data['uid'], data['name'], tgt.name, src.parent.name])
 
+                            if len(data.get('copies', [])) > 1:
+                                for c in data['copies']:
+                                    if c != data.get('master'):
+                                        writer.writerow([data['name'], c])
+
+            if self.stop_sig: return
+
+            with open(names_csv, 'w', newline='', encoding='utf-8-sig') as f:
+                writer = csv.writer(f)
+                writer.writerow(["Master_ID", "Master_UID", "Original_Name", "Exported_Name", "Source_Folder"])
+                writer.writerows(name_rows)
+
+            file_results = []
+            engine = self.copy_engine()
+            self.run_copies(engine, jobs, file_results, "Exporting")
             if self.stop_sig: return
 
             update_stats_time(ws, "organize_time", time.time() - start_time)
             self.set_job_status(ws, "ORGANIZED", "Done")
             
-            rpt = generate_job_report(ws, f"Unique Export ({priority_mode})")
+            rpt = generate_job_report(ws, f"Unique Export ({priority_mode})", file_results, {"Throughput": self.metrics.summary(), "Copy Workers": engine.workers}, len(jobs))
             
             self.emit(AppEvent(EventType.JOB_DATA, str(ws))) 
             self.prog_main(100, "Done")
@@ -555,7 +847,7 @@ class Worker:
         try:
             self.stop_sig = False; self.resume()
             ws = Path(ws_p); self.current_ws = str(ws)
-            if not (ws/"manifest.json").exists():
+            if not ManifestStore.available(ws):
                  self.log("CRITICAL: Manifest missing.", True)
                  self.emit(AppEvent(EventType.ERROR, "Manifest missing."))
                  self.emit(AppEvent(EventType.DONE))
@@ -564,46 +856,98 @@ class Worker:
             start_time = time.time(); 
             dst = ws / "Final_Delivery"
             self.log(f"Reconstruction Start ({priority_mode})")
+            self.metrics.reset()
             self.set_job_status(ws, "DISTRIBUTING", "Reconstructing...")
             
-            with open(ws/"manifest.json") as f: man = json.load(f)
-            
-            orphans = {}
-            if ext_src:
-                 orphans = {f.name: f for f in Path(ext_src).iterdir()}
-
-            self.emit(AppEvent(EventType.WORKER_CONFIG, 1))
+            with ManifestStore.open(ws) as man:
+                file_results = []
+                if ext_src:
+                     orphans = PrefixIndex(ext_src, CFG.get("ext_src_prefer_ext"))
+                     amb = orphans.ambiguous
+                     self.log(f"External Source: {orphans.files} files, {len(orphans.groups)} ids" + (f" ({len(amb)} with several files: preferring {orphans.prefer_ext or 'none'}, then newest)" if amb else ""))
+                else:
+                     sources = SourceIndex(ws)
 
-            for i, (h, d) in enumerate(man.items()):
-                if self.stop_sig: break
-                self.prog_main(((i+1)/len(man))*100, f"Recon {i+1}")
-                self.emit(AppEvent(EventType.SLOT_UPDATE, {"tid": threading.get_ident(), "text": f"Copying: {d['name']}", "percent": None}))
+                jobs = []; links = []
+                for i, (h, d) in enumerate(man.items()):
+                    if self.stop_sig: break
+                    if i % 500 == 0: self.prog_main(((i+1)/len(man))*100, "Planning Reconstruction...")
                 
-                if d.get("status") == "QUARANTINE": continue
+                    if d.get("status") == "QUARANTINE": continue
                 
-                src = None
-                if ext_src:
-                    src = next((v for k,v in orphans.items() if k.startswith(d['id'])), None)
-                else:
-                    src = self.get_best_source(ws, d['uid'], priority_mode)
+                    src = None
+                    if ext_src:
+                        src = orphans.find(d['id'])
+                        if not src:
+                            file_results.append({'file': d['uid'], 'orig_size': 0, 'new_size': 0, 'ok': False, 'skipped': False, 'status': 'UNMATCHED', 'error': f"No file starting with {d['id']} in external source"})
+                    else:
+                        src = sources.best(d['uid'], priority_mode)
                 
-                if not src: continue
+                    if not src: continue
                 
-                for c in d['copies']:
-                    t = dst / c; t.parent.mkdir(parents=True, exist_ok=True)
-                    shutil.copy2(src, t.with_suffix(src.suffix))
+                    targets = [(dst / c).with_suffix(src.suffix) for c in d['copies']]
+                    jobs.append((src, targets[0]))
+                    links += [(targets[0], t) for t in targets[1:]]
             
             if self.stop_sig: return
+            unmatched = len(file_results)
 
             q_src = ws / "00_Quarantine"
             if q_src.exists():
-                q_dst = dst / "_QUARANTINED_FILES"; q_dst.mkdir(parents=True, exist_ok=True) 
-                for qf in q_src.iterdir(): shutil.copy2(qf, q_dst / qf.name)
+                q_dst = dst / "_QUARANTINED_FILES"
+                jobs += [(qf, q_dst / qf.name) for qf in q_src.iterdir()]
+            planned = len(jobs) + len(links) + unmatched
+
+            # Archive formats: the planned layout is streamed into zip/tar volumes next to Final_Delivery,
+            # nothing is written to the folder. Each duplicate follows its first copy so tar can link it.
+            fmt = CFG.get("delivery_format")
+            if fmt in ARCHIVE_FORMATS:
+                dups = {}
+                for a, b in links: dups.setdefault(a, []).append(b)
+                def entries():
+                    for src, first in jobs:
+                        yield src, first.relative_to(dst)
+                        for b in dups.get(first, []): yield src, b.relative_to(dst)
+                writer = ArchiveWriter(dst, fmt, int(CFG.get("delivery_volume_mb")))
+                writer.clear_previous()
+                self.run_archive(writer, entries(), len(jobs) + len(links), file_results)
+                if self.stop_sig: return
+                update_stats_time(ws, "dist_time", time.time() - start_time)
+                self.set_job_status(ws, "DISTRIBUTED", "Done")
+                if unmatched: self.log(f"External Source: {unmatched} ids unmatched (see receipt)", True)
+                details = {"Throughput": self.metrics.summary(), "Archive": writer.summary(), "Volumes": ", ".join(p.name for p in writer.volumes)}
+                generate_job_report(ws, "Full Reconstruction", file_results, details, planned)
+                self.emit(AppEvent(EventType.JOB_DATA, str(ws)))
+                self.prog_main(100, "Done")
+                self.emit(AppEvent(EventType.DONE))
+                self.emit(AppEvent(EventType.NOTIFICATION, {"title": "Distribution Complete", "msg": f"Reconstruction archived ({len(writer.volumes)} volume(s)).", "open_path": str(ws)}))
+                return
+
+            # Link mode: each master is written once and every other copy becomes a link to that first copy,
+            # so time and disk use follow unique content. Removable media gets real files (delivery_materialize).
+            method = None
+            if CFG.get("delivery_mode") == "Link" and links:
+                if CFG.get("delivery_materialize") == "Auto" and is_removable(dst.parent):
+                    self.log("Delivery: removable media detected, writing real files")
+                else:
+                    method = probe_link_method(dst)
+                    self.log(f"Delivery: linking duplicates via {method}" if method else "Delivery: no link support on target, copying")
+            if not method: jobs += links
+
+            # replace=True: a link left by an earlier Link-mode run must not be written through
+            engine = self.copy_engine(lambda a, b: fast_copy(a, b, replace=True))
+            self.run_copies(engine, jobs, file_results, "Recon")
+            if method and not self.stop_sig:
+                self.run_copies(self.copy_engine(lambda a, b: link_file(a, b, method)), links, file_results, "Linking")
+            if self.stop_sig: return
 
             update_stats_time(ws, "dist_time", time.time() - start_time)
             self.set_job_status(ws, "DISTRIBUTED", "Done")
             
-            rpt = generate_job_report(ws, "Full Reconstruction")
+            if unmatched: self.log(f"External Source: {unmatched} ids unmatched (see receipt)", True)
+            details = {"Throughput": self.metrics.summary(), "Copy Workers": engine.workers}
+            if method: details["Delivery Links"] = f"{len(links)} duplicate copies linked ({method})"
+            rpt = generate_job_report(ws, "Full Reconstruction", file_results, details, planned)
             
             self.emit(AppEvent(EventType.JOB_DATA, str(ws))) 
             self.prog_main(100, "Done")
@@ -618,7 +962,7 @@ class Worker:
         try:
             self.stop_sig = False; self.resume()
             ws = Path(ws_p); self.current_ws = str(ws)
-            if not (ws/"manifest.json").exists(): return
+            if not ManifestStore.available(ws): return
 
             rpt_dir = ws / "04_Reports"
             rpt_dir.mkdir(parents=True, exist_ok=True)
@@ -626,45 +970,44 @@ class Worker:
 
             self.log("Generating Full Inventory CSV...")
             
-            with open(ws/"manifest.json") as f: man = json.load(f)
-            
-            try:
-                # utf-8-sig for Excel compatibility with special chars
-                with open(csv_path, 'w', newline='', encoding='utf-8-sig') as csvfile:
-                    writer = csv.writer(csvfile)
-                    writer.writerow(["ID", "Status", "Original_Filename", "Original_Path_Structure", "Master_Location_In_Workplace", "Hash_Type", "Hash", "Copy_Count", "Error_Details"])
+            with ManifestStore.open(ws) as man:
+                try:
+                    # utf-8-sig for Excel compatibility with special chars
+                    with open(csv_path, 'w', newline='', encoding='utf-8-sig') as csvfile:
+                        writer = csv.writer(csvfile)
+                        writer.writerow(["ID", "Status", "Original_Filename", "Original_Path_Structure", "Master_Location_In_Workplace", "Hash_Type", "Hash", "Copy_Count", "Error_Details"])
                     
-                    total = len(man)
-                    for i, (h, data) in enumerate(man.items()):
-                        if self.stop_sig: break
-                        self.prog_main(((i+1)/total)*100, "Writing CSV...")
+                        total = len(man)
+                        for i, (h, data) in enumerate(man.items()):
+                            if self.stop_sig: break
+                            self.prog_main(((i+1)/total)*100, "Writing CSV...")
                         
-                        uid = data.get('id', '?')
-                        status = data.get('status', 'OK')
-                        name = data.get('name', '?')
-                        master_rel = data.get('master', '')
+                            uid = data.get('id', '?')
+                            status = data.get('status', 'OK')
+                            name = data.get('name', '?')
+                            master_rel = data.get('master', '')
                         
-                        if status == "QUARANTINE":
-                            orig = data.get('orig_name', name)
-                            writer.writerow([uid, status, orig, "N/A - Quarantined", "00_Quarantine", "Binary", h, 0, data.get('error_reason', '')])
-                        else:
-                            copies = data.get('copies', [])
-                            for copy_path in copies:
-                                writer.writerow([
-                                    uid, 
-                                    status, 
-                                    name, 
-                                    copy_path, 
-                                    master_rel, 
-                                    "MD5", 
-                                    h, 
-                                    len(copies), 
-                                    ""
-                                ])
-            except PermissionError:
-                self.emit(AppEvent(EventType.ERROR, "Could not write CSV.\nPlease close the file in Excel and try again."))
-                self.emit(AppEvent(EventType.DONE))
-                return
+                            if status == "QUARANTINE":
+                                orig = data.get('orig_name', name)
+                                writer.writerow([uid, status, orig, "N/A - Quarantined", "00_Quarantine", "Binary", h, 0, data.get('error_reason', '')])
+                            else:
+                                copies = data.get('copies', [])
+                                for copy_path in copies:
+                                    writer.writerow([
+                                        uid, 
+                                        status, 
+                                        name, 
+                                        copy_path, 
+                                        master_rel, 
+                                        "MD5", 
+                                        h, 
+                                        len(copies), 
+                                        ""
+                                    ])
+                except PermissionError:
+                    self.emit(AppEvent(EventType.ERROR, "Could not write CSV.\nPlease close the file in Excel and try again."))
+                    self.emit(AppEvent(EventType.DONE))
+                    return
 
             if self.stop_sig: return
 
@@ -739,6 +1082,7 @@ class Worker:
                         err_f.write(str(e))
 
             # Core Logs
+            EVENT_LOG.flush()
             safe_copy(LOG_PATH, "app_debug.log")
             safe_copy(JSON_LOG_PATH, "app_events.jsonl")
             safe_copy(CFG.path, "config.json")
@@ -756,4 +1100,20 @@ class Worker:
             self.emit(AppEvent(EventType.NOTIFICATION, {"title": "Debug Export", "msg": f"Saved to {dest_zip.name}", "open_path": str(base_dir)}))
             
         except Exception as e:
-            self.emit(AppEvent(EventType.ERROR, f"Export Failed: {e}"))
\ No newline at end of file
+            self.emit(AppEvent(EventType.ERROR, f"Export Failed: {e}"))
+
+# ==============================================================================
+#   PROCESS BACKEND (runs inside pool children)
+# ==============================================================================
+_CHILD = None
+
+def _child_init(event_q, stop_ev, pause_ev):
+    """Builds a headless Worker whose events go back to the parent through event_q."""
+    global _CHILD
+    _CHILD = Worker(callback=event_q.put)
+    _CHILD.pause_event = pause_ev
+    _CHILD._cancel = stop_ev
+
+def _child_process_file(f, options, base_dst, ws, budget_s=None):
+    _CHILD.current_ws = ws
+    return _CHILD.process_file_task(f, _CHILD.make_bots(_CHILD._cancel), options, base_dst, _CHILD._cancel, budget_s)
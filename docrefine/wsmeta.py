@@ -0,0 +1,150 @@
+# SAVE AS: docrefine/wsmeta.py
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+
+LOCK_NAME = ".workspace.lock"
+# Rewrites of the same file inside this window are folded into one trailing write
+COALESCE_S = 0.25
+
+# ==============================================================================
+#   ATOMIC WRITES
+# ==============================================================================
+def _fsync_dir(d):
+    """Makes the rename itself durable (POSIX; Windows has no directory handles for this)."""
+    if os.name != "posix": return
+    try:
+        fd = os.open(d, os.O_RDONLY)
+        try: os.fsync(fd)
+        finally: os.close(fd)
+    except OSError: pass
+
+@contextmanager
+def atomic_open(path, mode='w', encoding=None, newline=None):
+    """
+    File handle for a complete replacement of path. Data goes to a hidden temp file next to it,
+    is fsynced, then renamed over path; readers see the old file or the new one, never a partial one.
+    Nothing is replaced if the block raises.
+    """
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}-{threading.get_ident()}.tmp")
+    try:
+        with open(tmp, mode, encoding=encoding, newline=newline) as f:
+            yield f
+            f.flush(); os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try: tmp.unlink()
+        except OSError: pass
+        raise
+    _fsync_dir(path.parent)
+
+def atomic_write_json(path, obj, indent=4, encoding=None):
+    with atomic_open(path, encoding=encoding) as f: json.dump(obj, f, indent=indent)
+
+def read_json(path, default=None):
+    """Parsed JSON, or default when the file is missing or unreadable."""
+    try:
+        with open(path) as f: return json.load(f)
+    except (OSError, ValueError): return default
+
+# ==============================================================================
+#   WORKSPACE LOCK
+# ==============================================================================
+_LOCKS = {}
+_LOCKS_GUARD = threading.Lock()
+_held = threading.local()
+
+def _lock_fd(f):
+    if os.name == "nt":
+        import msvcrt
+        while True:
+            # LK_LOCK gives up after ~10 s; keep waiting like flock does
+            try: msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1); return
+            except OSError: time.sleep(0.1)
+    import fcntl
+    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+def _unlock_fd(f):
+    if os.name == "nt":
+        import msvcrt
+        f.seek(0); msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+@contextmanager
+def workspace_lock(ws):
+    """
+    Exclusive lock on one workspace's metadata, across threads, processes and (where the share
+    honours flock/LockFile) machines. Re-entrant within a thread.
+    """
+    key = os.path.realpath(ws)
+    held = getattr(_held, 'keys', None)
+    if held is None: held = _held.keys = set()
+    if key in held:
+        yield; return
+    with _LOCKS_GUARD: tlock = _LOCKS.setdefault(key, threading.Lock())
+    with tlock:
+        with open(os.path.join(key, LOCK_NAME), 'a+b') as f:
+            _lock_fd(f); held.add(key)
+            try: yield
+            finally:
+                held.discard(key)
+                try: _unlock_fd(f)
+                except OSError: pass
+
+def update_json(path, fn, default=dict, indent=4):
+    """Locked read-modify-write: fn(obj) edits the parsed file in place (or returns a replacement)."""
+    path = Path(path)
+    with workspace_lock(path.parent):
+        obj = read_json(path)
+        if obj is None: obj = default()
+        new = fn(obj)
+        atomic_write_json(path, obj if new is None else new, indent=indent)
+
+# ==============================================================================
+#   COALESCING WRITER
+# ==============================================================================
+class MetaWriter:
+    """
+    Small whole-file JSON writes (status.json) coalesced per path: the first write goes straight
+    out, rewrites within COALESCE_S keep only the latest content and land in one trailing write.
+    flush() writes everything pending; the worker calls it before announcing DONE.
+    """
+    def __init__(self, delay=COALESCE_S):
+        self.delay = delay
+        self.lock = threading.RLock()
+        self.pending = {}
+        self.last = {}
+        self.timer = None
+        atexit.register(self.flush)
+
+    def _write(self, path, obj):
+        try:
+            with workspace_lock(path.parent): atomic_write_json(path, obj)
+        except Exception as e: print(f"Metadata Write Error ({path.name}): {e}", file=sys.stderr)
+        self.last[path] = time.time()
+
+    def write_json(self, path, obj):
+        path = Path(path)
+        with self.lock:
+            if path not in self.pending and time.time() - self.last.get(path, 0) >= self.delay:
+                self._write(path, obj); return
+            self.pending[path] = obj
+            if self.timer is None:
+                self.timer = threading.Timer(self.delay, self.flush)
+                self.timer.daemon = True; self.timer.start()
+
+    def flush(self):
+        with self.lock:
+            if self.timer is not None: self.timer.cancel(); self.timer = None
+            pending, self.pending = self.pending, {}
+            for path, obj in pending.items(): self._write(path, obj)
+
+META = MetaWriter()
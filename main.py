@@ -1,7 +1,10 @@
 import sys
+import multiprocessing
 from docrefine.config import log_app
 
 if __name__ == "__main__":
+    # Required for the process-pool refine backend in frozen (PyInstaller) builds
+    multiprocessing.freeze_support()
     try:
         log_app("Booting DocRefine Pro (Qt/PySide6 Edition)...")
         # Import the new Qt App Runner